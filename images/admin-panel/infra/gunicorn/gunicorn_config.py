@@ -1,6 +1,90 @@
+import math
+import os
+from os import environ
+from typing import Any
+
 command = '/usr/bin/gunicorn'
 pythonpath = '/app'
-bind = '0.0.0.0:8000'
-workers = 1
+bind = environ.get('GUNICORN_BIND', '0.0.0.0:8000')
 limit_request_fields = 32000
 limit_request_field_size = 0
+
+
+def cgroup_cpu_limit() -> int | None:
+    """Квота CPU контейнера из cgroup v2 (cpu.max) или v1 (cfs_quota_us), округлённая вверх"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as cpu_max:
+            quota, period = cpu_max.read().split()
+    except (OSError, ValueError):
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as quota_file:
+                quota = quota_file.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as period_file:
+                period = period_file.read().strip()
+        except OSError:
+            return None
+    if quota in {'max', '-1'}:
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+
+# Число воркеров по умолчанию выводится из доступных процессу ядер с учётом квоты контейнера:
+# os.process_cpu_count() видит все ядра узла, даже если cgroup ограничивает процессорное время
+cpu_count = min(filter(None, (os.process_cpu_count(), cgroup_cpu_limit())), default=1)
+workers = int(environ.get('GUNICORN_WORKERS', cpu_count * 2 + 1))
+threads = int(environ.get('GUNICORN_THREADS', 4))
+
+# wsgi — потоковые воркеры gthread, asgi — воркеры uvicorn с циклом событий
+server_mode = environ.get('SERVER_MODE', 'wsgi')
+if server_mode == 'asgi':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    wsgi_app = 'config.asgi:application'
+else:
+    worker_class = 'gthread' if threads > 1 else 'sync'
+    wsgi_app = 'config.wsgi:application'
+
+# Django импортируется один раз в мастере, воркеры получают его через fork.
+# Перезагрузка кода с preload не работает, поэтому reload его отключает
+reload = environ.get('GUNICORN_RELOAD') == 'True'
+preload_app = environ.get('GUNICORN_PRELOAD', 'True') == 'True' and not reload
+
+# Перезапуск воркеров ограничивает рост памяти, разброс не даёт им перезапуститься разом
+max_requests = int(environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(environ.get('GUNICORN_KEEPALIVE', 5))
+
+
+# Каталог, в котором воркеры хранят метрики, чтобы /metrics суммировал их по всем процессам.
+# Файлы прошлого запуска удаляются при чтении конфигурации, до загрузки приложения с preload
+prometheus_multiproc_dir = environ.get('PROMETHEUS_MULTIPROC_DIR')
+if prometheus_multiproc_dir and os.path.isdir(prometheus_multiproc_dir):
+    for name in os.listdir(prometheus_multiproc_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(prometheus_multiproc_dir, name))
+
+
+def pre_fork(server: Any, worker: Any) -> None:
+    """Закрывает соединения с базой мастера, чтобы воркеры не унаследовали их сокеты"""
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """Воркер создаёт свои клиенты Elasticsearch и MongoDB вместо унаследованных"""
+    if preload_app:
+        from movies.clients import reset_clients
+
+        reset_clients()
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    """Помечает завершившийся воркер, чтобы его живые значения не учитывались в метриках"""
+    if prometheus_multiproc_dir:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)  # type: ignore[no-untyped-call]
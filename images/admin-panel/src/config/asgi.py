@@ -1,7 +1,34 @@
+import asyncio
 import os
+from typing import Any
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from movies.clients import aclose_clients  # noqa: E402
+from movies.sync import bind_event_loop, wait_scheduled  # noqa: E402
+
+
+async def application(scope: dict[str, Any], receive: Any, send: Any) -> None:
+    """
+    Django не обрабатывает lifespan ASGI: при запуске сервера запоминаем цикл
+    событий для режима синхронизации async, при остановке дожидаемся
+    применения изменений и закрываем асинхронные клиенты.
+    """
+    if scope['type'] != 'lifespan':
+        bind_event_loop(asyncio.get_running_loop())
+        await django_application(scope, receive, send)
+        return
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            bind_event_loop(asyncio.get_running_loop())
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await wait_scheduled()
+            await aclose_clients()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -1,3 +1,4 @@
+from ipaddress import ip_network
 from os import environ
 from pathlib import Path
 
@@ -19,6 +20,7 @@ INSTALLED_APPS = [  # noqa: WPS407
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # django 3rd party
     'django_filters',
     # local
@@ -58,6 +60,7 @@ TEMPLATES = [  # noqa: WPS407
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
@@ -73,6 +76,11 @@ DATABASES = {  # noqa: WPS407
     },
 }
 
+# fulltext — поиск в админке по индексам PostgreSQL, like — ILIKE по search_fields
+ADMIN_SEARCH_MODE = environ.get('ADMIN_SEARCH_MODE', 'fulltext')
+# Выше этого числа строк в списках админки показывается оценка планировщика
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000))
+
 
 # Password validation
 
@@ -125,6 +133,18 @@ ELASTICSEARCH_HOST = environ.get('ELASTIC_HOST', 'elastic')
 ELASTICSEARCH_PORT = environ.get('ELASTIC_PORT', '9200')
 ELASTICSEARCH_USER = environ.get('ELASTIC_USER', 'elastic')
 ELASTICSEARCH_PASSWORD = environ.get('ELASTIC_PASSWORD', '')
+ELASTICSEARCH_CONNECTIONS_PER_NODE = int(environ.get('ELASTIC_CONNECTIONS_PER_NODE', 10))
+ELASTICSEARCH_HTTP_COMPRESS = environ.get('ELASTIC_HTTP_COMPRESS', 'True') == 'True'
+ELASTICSEARCH_REQUEST_TIMEOUT = float(environ.get('ELASTIC_REQUEST_TIMEOUT', 10))
+ELASTICSEARCH_BULK_CHUNK_SIZE = int(environ.get('ELASTIC_BULK_CHUNK_SIZE', 500))
+ELASTICSEARCH_BULK_THREADS = int(environ.get('ELASTIC_BULK_THREADS', 4))
+ELASTICSEARCH_REFRESH = environ.get('ELASTIC_REFRESH', 'true')  # true | wait_for | false | interval
+ELASTICSEARCH_REFRESH_INTERVAL = float(environ.get('ELASTIC_REFRESH_INTERVAL', 1.0))
+# Порог flush транслога при массовой загрузке и таймаут слияния сегментов после неё
+ELASTICSEARCH_BULK_TRANSLOG_FLUSH_THRESHOLD = environ.get(
+    'ELASTIC_BULK_TRANSLOG_FLUSH_THRESHOLD', '1gb'
+)
+ELASTICSEARCH_FORCEMERGE_TIMEOUT = float(environ.get('ELASTIC_FORCEMERGE_TIMEOUT', 600))
 ELASTICSEARCH_SETTINGS = {  # noqa: WPS407
     'refresh_interval': '1s',
     'analysis': {
@@ -165,9 +185,11 @@ ELASTICSEARCH_SETTINGS = {  # noqa: WPS407
         },
     },
 }
+# fingerprint — отпечаток содержимого документа, по нему сверка находит устаревшие документы
 ELASTICSEARCH_INDICES = {  # noqa: WPS407
     'movies': {
         'id': {'type': 'keyword'},
+        'fingerprint': {'type': 'keyword', 'index': False},
         'rating': {'type': 'float'},
         'genres': {'type': 'keyword'},
         'title': {
@@ -209,6 +231,7 @@ ELASTICSEARCH_INDICES = {  # noqa: WPS407
     },
     'persons': {
         'id': {'type': 'keyword'},
+        'fingerprint': {'type': 'keyword', 'index': False},
         'full_name': {
             'type': 'text',
             'analyzer': 'ru_en',
@@ -217,6 +240,7 @@ ELASTICSEARCH_INDICES = {  # noqa: WPS407
     },
     'genres': {
         'id': {'type': 'keyword'},
+        'fingerprint': {'type': 'keyword', 'index': False},
         'name': {
             'type': 'text',
             'analyzer': 'ru_en',
@@ -234,6 +258,10 @@ MONGO_PORT = int(environ.get('MONGO_PORT', 27017))
 MONGO_USERNAME = environ.get('MONGO_USERNAME', None)
 MONGO_PASSWORD = environ.get('MONGO_PASSWORD', None)
 MONGO_UUID_REPRESENTATION = 'standard'
+MONGO_MAX_POOL_SIZE = int(environ.get('MONGO_MAX_POOL_SIZE', 20))
+MONGO_MIN_POOL_SIZE = int(environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_COMPRESSORS = environ.get('MONGO_COMPRESSORS', 'zlib')
 MONGO_COLLECTION_SCHEMAS = {  # noqa: WPS407
     'users': {
         'bsonType': 'object',
@@ -306,6 +334,36 @@ MONGO_COLLECTION_SCHEMAS = {  # noqa: WPS407
 }
 
 
+# Metrics
+
+# Каталог файлов метрик воркеров gunicorn, без него метрики хранятся в памяти процесса
+PROMETHEUS_MULTIPROC_DIR = environ.get('PROMETHEUS_MULTIPROC_DIR')
+# /metrics без входа в админку доступен только напрямую из этих сетей, не через прокси
+METRICS_ALLOWED_NETWORKS = [
+    ip_network(network)
+    for network in environ.get(
+        'METRICS_ALLOWED_NETWORKS',
+        '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16',
+    ).split(',')
+]
+
+
+# Sync
+
+# async — как inline, но изменения применяются в цикле событий ASGI-сервера, не задерживая ответ
+SYNC_MODE = environ.get('SYNC_MODE', 'inline')  # inline | outbox | async
+SYNC_BATCH_SIZE = int(environ.get('SYNC_BATCH_SIZE', 500))
+SYNC_CHUNK_SIZE = int(environ.get('SYNC_CHUNK_SIZE', 500))
+SYNC_POLL_INTERVAL = float(environ.get('SYNC_POLL_INTERVAL', 1.0))
+SYNC_MAX_ATTEMPTS = int(environ.get('SYNC_MAX_ATTEMPTS', 5))
+SYNC_WATERMARK_OVERLAP = float(environ.get('SYNC_WATERMARK_OVERLAP', 60))
+SYNC_INCREMENTAL_INTERVAL = float(environ.get('SYNC_INCREMENTAL_INTERVAL', 300))
+# Не отправлять в Elasticsearch документы, совпадающие с последними отправленными
+SYNC_SKIP_UNCHANGED = environ.get('SYNC_SKIP_UNCHANGED', 'True') == 'True'
+# Корзины сверки меньше этого размера сравниваются по id, большие делятся дальше
+RECONCILE_LEAF_SIZE = int(environ.get('RECONCILE_LEAF_SIZE', 2000))
+
+
 STORAGES = {  # noqa: WPS407
     'staticfiles': {
         'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
@@ -1,8 +1,82 @@
+from typing import Any
+from uuid import UUID
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import CharField, Exists, F, Model, OuterRef, Q, Subquery
+from django.db.models.functions import Greatest
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
+from config import settings
+from movies.consts import SEARCH_CONFIG
 from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from movies.pagination import EstimatedCountPaginator, KeysetChangeList
+from movies.sync import delete_filmworks
+
+
+def joined_values(model: type[Model], owner: str, field: str) -> Subquery:
+    """
+    Значения поля связанных записей через запятую.
+    Агрегируются в SQL коррелированным подзапросом, поэтому список выводится
+    одним запросом независимо от числа строк на странице.
+    """
+    return Subquery(
+        model._default_manager.filter(**{owner: OuterRef('pk')})
+        .values(owner)
+        .annotate(joined=StringAgg(field, ', ', ordering=field))
+        .values('joined'),
+        output_field=CharField(),
+    )
+
+
+class IndexedSearchAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    """
+    Поиск по индексам PostgreSQL вместо ILIKE по `search_fields`:
+    полнотекстовый по `search_vector_field` и триграммный по `trigram_fields`.
+    Результаты упорядочиваются по релевантности, если не выбрана сортировка.
+    """
+
+    search_vector_field: str | None = None
+    trigram_fields: tuple[str, ...] = ()
+
+    def get_search_results(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet[Model],
+        search_term: str,
+    ) -> tuple[QuerySet[Model], bool]:
+        term = search_term.strip()
+        if settings.ADMIN_SEARCH_MODE != 'fulltext' or not term:
+            return super().get_search_results(request, queryset, search_term)
+        try:
+            return queryset.filter(pk=UUID(term)), False
+        except ValueError:
+            pass
+
+        condition = self.get_related_search(term)
+        ranks: list[SearchRank | TrigramWordSimilarity] = []
+        if self.search_vector_field:
+            query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+            condition |= Q(**{self.search_vector_field: query})
+            ranks.append(SearchRank(F(self.search_vector_field), query))
+        for field in self.trigram_fields:
+            condition |= Q(**{f'{field}__trigram_word_similar': term})
+            ranks.append(TrigramWordSimilarity(term, field))
+
+        queryset = queryset.filter(condition)
+        if ranks:
+            rank = ranks[0] if len(ranks) == 1 else Greatest(*ranks)
+            queryset = queryset.annotate(search_rank=rank)
+            if ORDER_VAR not in request.GET:
+                queryset = queryset.order_by('-search_rank', *queryset.query.order_by)
+        return queryset, False
+
+    def get_related_search(self, term: str) -> Q:
+        """Условие поиска по связанным моделям, без соединений и DISTINCT."""
+        return Q()
 
 
 class GenreFilmworkInline(admin.TabularInline):
@@ -16,27 +90,40 @@ class PersonFilmworkInline(admin.TabularInline):
 
 
 @admin.register(Person)
-class PersonAdmin(admin.ModelAdmin):
+class PersonAdmin(IndexedSearchAdmin):
     list_display = ('full_name', 'get_roles')
     list_filter = ('personfilmwork__role',)
     search_fields = ('full_name', 'id')
+    trigram_fields = ('full_name',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request: HttpRequest, **kwargs: Any) -> type[KeysetChangeList]:
+        changelist: type[KeysetChangeList] = KeysetChangeList
+        return changelist
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet[Person]:
+        """Загрузка персон с ролями, агрегированными в SQL."""
+        queryset: QuerySet[Person] = super().get_queryset(request)
+        queryset = queryset.annotate(roles=joined_values(PersonFilmwork, 'person', 'role'))
+        return queryset
 
     @admin.display(description='роль')
     def get_roles(self, object: Person) -> str:
         """Вывод ролей участников кинопроизведений."""
-        return ', '.join(
-            [str(personfilmwork.role) for personfilmwork in object.personfilmwork_set.all()],
-        )
+        return object.roles or ''
 
 
 @admin.register(Genre)
-class GenreAdmin(admin.ModelAdmin):
+class GenreAdmin(IndexedSearchAdmin):
     list_display = ('name', 'description')
     search_fields = ('name', 'description')
+    search_vector_field = 'search_vector'
+    trigram_fields = ('name',)
 
 
 @admin.register(Filmwork)
-class FilmworkAdmin(admin.ModelAdmin):
+class FilmworkAdmin(IndexedSearchAdmin):
     list_display = (
         'title',
         'release_date',
@@ -51,21 +138,51 @@ class FilmworkAdmin(admin.ModelAdmin):
         'description',
         'persons__full_name',
     )
+    search_vector_field = 'search_vector'
+    trigram_fields = ('title',)
     inlines = (GenreFilmworkInline, PersonFilmworkInline)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request: HttpRequest, **kwargs: Any) -> type[KeysetChangeList]:
+        changelist: type[KeysetChangeList] = KeysetChangeList
+        return changelist
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Filmwork]:
         """Загрузка кинопроизведений и связанных данных."""
-        queryset = super().get_queryset(request)
+        queryset: QuerySet[Filmwork] = super().get_queryset(request)
         if request.resolver_match.view_name.endswith('change'):
             return queryset.prefetch_related('genres', 'persons')
+        queryset = queryset.annotate(
+            genre_names=joined_values(GenreFilmwork, 'film_work', 'genre__name'),
+            person_names=joined_values(PersonFilmwork, 'film_work', 'person__full_name'),
+        )
         return queryset
 
+    def get_related_search(self, term: str) -> Q:
+        """Фильмы с участниками, имя которых похоже на искомое."""
+        return Q(
+            Exists(
+                PersonFilmwork.objects.filter(
+                    film_work=OuterRef('pk'),
+                    person__full_name__trigram_word_similar=term,
+                ),
+            ),
+        )
+
+    def delete_queryset(self, request: HttpRequest, queryset: QuerySet[Filmwork]) -> None:
+        """
+        Пакетное удаление кинопроизведений с синхронизацией ES и MongoDB пачками.
+        Удаляются фильмы по id выбранных, без агрегатов и сортировки списка.
+        """
+        delete_filmworks(Filmwork.objects.filter(pk__in=queryset.values('pk')))
+
     @admin.display(description='жанры')
     def get_genres(self, object: Filmwork) -> str:
         """Вывод жанров кинопроизведения."""
-        return ', '.join([genre.name for genre in object.genres.all()])
+        return object.genre_names or ''
 
     @admin.display(description='участники')
     def get_persons(self, object: Filmwork) -> str:
         """Вывод имён персонала съемочной группы кинопроизведения."""
-        return ', '.join([person.full_name for person in object.persons.all()])
+        return object.person_names or ''
@@ -0,0 +1,7 @@
+"""
+Бенчмарки горячих путей синхронизации и админки.
+
+Запускаются командой `benchmark` на локальном PostgreSQL. Elasticsearch
+и MongoDB заменяются процессными заглушками из `standins`, поэтому
+измеряется работа сервиса без сетевых задержек внешних хранилищ.
+"""
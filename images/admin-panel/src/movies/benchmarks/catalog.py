@@ -0,0 +1,98 @@
+"""Синтетический каталог для бенчмарков в формате фикстуры `load_catalog`."""
+
+import random
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from movies.enums import FilmworkType, PersonRole
+
+# Префикс имён синтетических объектов, чтобы их можно было отличить от настоящих
+SYNTHETIC_PREFIX = 'bench'
+
+# Словарь для описаний фильмов
+WORDS = (
+    'space',
+    'prison',
+    'escape',
+    'planet',
+    'love',
+    'war',
+    'detective',
+    'city',
+    'family',
+    'secret',
+    'journey',
+    'robot',
+    'kingdom',
+    'island',
+    'revenge',
+    'friendship',
+)
+
+
+@dataclass
+class SyntheticCatalog:
+    """Параметры синтетического каталога и id созданных в нём объектов."""
+
+    films: int = 1000
+    persons: int = 4000
+    genres: int = 30
+    persons_per_film: int = 6
+    genres_per_film: int = 2
+    seed: int = 0
+    film_ids: list[uuid.UUID] = field(default_factory=list)
+    person_ids: list[uuid.UUID] = field(default_factory=list)
+    genre_ids: list[uuid.UUID] = field(default_factory=list)
+
+    def records(self) -> Iterator[dict[str, Any]]:
+        """Записи каталога: жанры, персоны, фильмы и связи между ними."""
+        rng = random.Random(self.seed)
+        token = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+        self.genre_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(self.genres)]
+        self.person_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(self.persons)]
+        self.film_ids = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(self.films)]
+
+        for number, genre_id in enumerate(self.genre_ids):
+            yield _record(
+                'movies.genre',
+                genre_id,
+                name=f'{SYNTHETIC_PREFIX} {token} genre {number}',
+                description=f'Synthetic genre {number}',
+            )
+        for number, person_id in enumerate(self.person_ids):
+            yield _record(
+                'movies.person',
+                person_id,
+                full_name=f'{SYNTHETIC_PREFIX} {token} person {number}',
+            )
+        for number, film_id in enumerate(self.film_ids):
+            yield _record(
+                'movies.filmwork',
+                film_id,
+                title=f'{SYNTHETIC_PREFIX} {token} film {number}',
+                description=' '.join(rng.choices(WORDS, k=30)),
+                rating=round(rng.uniform(0, 10), 1),
+                type=rng.choice(FilmworkType.values),
+            )
+        for film_id in self.film_ids:
+            for genre_id in rng.sample(self.genre_ids, min(self.genres_per_film, self.genres)):
+                yield _record(
+                    'movies.genrefilmwork',
+                    uuid.UUID(int=rng.getrandbits(128)),
+                    film_work=str(film_id),
+                    genre=str(genre_id),
+                )
+            for person_id in rng.sample(self.person_ids, min(self.persons_per_film, self.persons)):
+                yield _record(
+                    'movies.personfilmwork',
+                    uuid.UUID(int=rng.getrandbits(128)),
+                    film_work=str(film_id),
+                    person=str(person_id),
+                    role=rng.choice(PersonRole.values),
+                )
+
+
+def _record(model: str, pk: uuid.UUID, **fields: Any) -> dict[str, Any]:
+    return {'model': model, 'pk': str(pk), 'fields': fields}
@@ -0,0 +1,221 @@
+"""Процессные заглушки Elasticsearch и MongoDB для бенчмарков."""
+
+import json
+from collections import defaultdict
+from collections.abc import Iterable
+from types import SimpleNamespace
+from typing import Any
+
+from elastic_transport import ApiResponseMeta, HeadApiResponse, HttpHeaders, ObjectApiResponse
+from elasticsearch import Elasticsearch
+
+
+def _response_meta(status: int = 200) -> ApiResponseMeta:
+    return ApiResponseMeta(
+        status=status,
+        http_version='1.1',
+        headers=HttpHeaders({'x-elastic-product': 'Elasticsearch'}),
+        duration=0.0,
+        node=None,  # type: ignore[arg-type]
+    )
+
+
+class InMemoryElasticsearch(Elasticsearch):
+    """
+    Клиент Elasticsearch, хранящий документы в памяти.
+    Поддерживает запросы, которые выполняет синхронизация: bulk, индексацию,
+    удаление и чтение документов, обновление индекса и подсчёт документов.
+    `update_by_query` принимается, но документы не изменяет.
+    """
+
+    def __init__(self) -> None:
+        super().__init__('http://localhost:9200')
+        self.indices_data: dict[str, dict[str, Any]] = defaultdict(dict)
+        self.requests = 0
+
+    def options(self, **kwargs: Any) -> 'InMemoryElasticsearch':
+        """Заглушка не возвращает ошибок, поэтому параметры запросов не нужны."""
+        return self
+
+    def perform_request(  # type: ignore[override]
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        body: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        self.requests += 1
+        parts = [part for part in path.split('/') if part]
+        if parts and parts[-1] == '_bulk':
+            return ObjectApiResponse(self._bulk(body), _response_meta())
+        if len(parts) == 2 and parts[1] == '_mget':
+            return ObjectApiResponse(self._mget(parts[0], body['ids']), _response_meta())
+        if len(parts) == 2 and parts[1] == '_update_by_query':
+            return ObjectApiResponse({'updated': 0, 'failures': []}, _response_meta())
+        if method == 'HEAD':
+            return HeadApiResponse(_response_meta())
+        if len(parts) == 3 and parts[1] == '_doc':
+            documents = self.indices_data[parts[0]]
+            if method == 'DELETE':
+                documents.pop(parts[2], None)
+            else:
+                documents[parts[2]] = body
+            return ObjectApiResponse({'result': 'ok'}, _response_meta())
+        if len(parts) == 2 and parts[1] == '_count':
+            count = len(self.indices_data[parts[0]])
+            return ObjectApiResponse({'count': count}, _response_meta())
+        return ObjectApiResponse({'acknowledged': True}, _response_meta())
+
+    def _bulk(self, body: Any) -> dict[str, Any]:
+        if isinstance(body, (bytes, str)):
+            body = body.splitlines()
+        lines = iter(
+            json.loads(line) if isinstance(line, (bytes, str)) else line for line in body if line
+        )
+        items = []
+        for action in lines:
+            ((operation, meta),) = action.items()
+            documents = self.indices_data[meta['_index']]
+            if operation == 'delete':
+                status = 200 if documents.pop(meta['_id'], None) is not None else 404
+            elif operation == 'update':
+                changes = next(lines)['doc']
+                status = 200 if meta['_id'] in documents else 404
+                if status == 200:
+                    documents[meta['_id']].update(changes)
+            else:
+                documents[meta['_id']] = next(lines)
+                status = 201
+            items.append({operation: {'_id': meta['_id'], 'status': status}})
+        return {'errors': False, 'items': items}
+
+    def _mget(self, index: str, ids: list[str]) -> dict[str, Any]:
+        documents = self.indices_data[index]
+        return {
+            'docs': [
+                (
+                    {'_id': id_, 'found': True, '_source': documents[id_]}
+                    if id_ in documents
+                    else {'_id': id_, 'found': False}
+                )
+                for id_ in ids
+            ],
+        }
+
+
+class InMemoryCollection:
+    """Коллекция MongoDB в памяти с операциями, которые использует сервис."""
+
+    def __init__(self) -> None:
+        self.documents: dict[Any, dict[str, Any]] = {}
+        self.requests = 0
+
+    def insert_one(self, document: dict[str, Any]) -> SimpleNamespace:
+        self.requests += 1
+        self.documents[document['_id']] = document
+        return SimpleNamespace(inserted_id=document['_id'])
+
+    def insert_many(self, documents: Iterable[dict[str, Any]], **kwargs: Any) -> SimpleNamespace:
+        self.requests += 1
+        ids = []
+        for document in documents:
+            self.documents.setdefault(document['_id'], document)
+            ids.append(document['_id'])
+        return SimpleNamespace(inserted_ids=ids)
+
+    def bulk_write(self, operations: Iterable[Any], **kwargs: Any) -> SimpleNamespace:
+        """Поддерживает upsert-операции `UpdateOne` с `$setOnInsert`."""
+        self.requests += 1
+        for operation in operations:
+            document_id = operation._filter['_id']
+            if document_id not in self.documents:
+                self.documents[document_id] = {
+                    '_id': document_id,
+                    **operation._doc.get('$setOnInsert', {}),
+                }
+        return SimpleNamespace()
+
+    def find(self, query: dict[str, Any], *args: Any, **kwargs: Any) -> list[dict[str, Any]]:
+        self.requests += 1
+        return [document for document in self.documents.values() if _matches(document, query)]
+
+    def delete_one(self, query: dict[str, Any]) -> SimpleNamespace:
+        self.requests += 1
+        for document_id, document in self.documents.items():
+            if _matches(document, query):
+                del self.documents[document_id]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    def delete_many(self, query: dict[str, Any]) -> SimpleNamespace:
+        self.requests += 1
+        matched = [key for key, document in self.documents.items() if _matches(document, query)]
+        for document_id in matched:
+            del self.documents[document_id]
+        return SimpleNamespace(deleted_count=len(matched))
+
+    def update_many(self, query: dict[str, Any], update: dict[str, Any]) -> SimpleNamespace:
+        """Поддерживает только `$pull`."""
+        self.requests += 1
+        modified = 0
+        for document in self.documents.values():
+            if not _matches(document, query):
+                continue
+            for field, condition in update.get('$pull', {}).items():
+                document[field] = [
+                    item for item in document.get(field, []) if not _matches(item, condition)
+                ]
+            modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+    def create_index(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+
+class InMemoryDatabase(defaultdict[str, InMemoryCollection]):
+    def __init__(self) -> None:
+        super().__init__(InMemoryCollection)
+
+    def create_collection(self, name: str, **kwargs: Any) -> InMemoryCollection:
+        return self[name]
+
+
+class InMemoryMongo(defaultdict[str, InMemoryDatabase]):
+    """Клиент MongoDB, хранящий базы и коллекции в памяти."""
+
+    def __init__(self) -> None:
+        super().__init__(InMemoryDatabase)
+
+    @property
+    def requests(self) -> int:
+        return sum(
+            collection.requests for database in self.values() for collection in database.values()
+        )
+
+    def close(self) -> None:
+        return None
+
+
+def _matches(document: dict[str, Any], query: dict[str, Any]) -> bool:
+    """Проверяет документ на соответствие условиям на равенство и `$in`."""
+    for path, condition in query.items():
+        values = _values(document, path.split('.'))
+        if isinstance(condition, dict) and '$in' in condition:
+            if not any(value in condition['$in'] for value in values):
+                return False
+        elif condition not in values:
+            return False
+    return True
+
+
+def _values(document: Any, path: list[str]) -> list[Any]:
+    if not path:
+        return [document]
+    if isinstance(document, list):
+        return [value for item in document for value in _values(item, path)]
+    if not isinstance(document, dict) or path[0] not in document:
+        return []
+    return _values(document[path[0]], path[1:])
@@ -0,0 +1,265 @@
+"""Набор бенчмарков: документы, обработчики сигналов, админка, загрузка и индексация."""
+
+import platform
+import statistics
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from itertools import cycle
+from typing import Any
+
+import django
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models import Count
+from django.http import HttpRequest
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import resolve
+from django.utils import timezone
+
+from config import settings
+from movies import signals
+from movies.benchmarks.catalog import SyntheticCatalog
+from movies.benchmarks.standins import InMemoryElasticsearch, InMemoryMongo
+from movies.clients import use_clients
+from movies.elastic import elastic_service
+from movies.enums import FilmworkAccessType
+from movies.importers import CatalogLoader
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from movies.sync import index_changed_since
+
+
+class BenchmarkSuite:
+    """
+    Запускает бенчмарки на синтетическом каталоге и возвращает результаты словарём,
+    пригодным для сериализации в JSON. Каталог загружается в отдельную временную
+    базу, которая создаётся перед запуском и удаляется после него, поэтому замеры
+    не зависят от данных рабочей базы и не изменяют её.
+    """
+
+    def __init__(
+        self,
+        catalog: SyntheticCatalog,
+        repeat: int = 5,
+        batch_size: int = settings.SYNC_BATCH_SIZE,
+    ) -> None:
+        self.catalog = catalog
+        self.repeat = repeat
+        self.batch_size = batch_size
+        self.elasticsearch = InMemoryElasticsearch()
+        self.mongo = InMemoryMongo()
+
+    def run(self) -> dict[str, Any]:
+        started = timezone.now()
+        results: dict[str, Any] = {}
+        with self._database(), self._environment():
+            results['bulk_load'] = self.bench_bulk_load()
+            self._check_catalog()
+            results['reindex'] = self.bench_reindex()
+            results['documents'] = self.bench_documents()
+            results['signals'] = self.bench_signals()
+            results['changelist'] = self.bench_changelist()
+        return {
+            'started_at': started.isoformat(),
+            'environment': self._describe_environment(),
+            'catalog': {
+                'films': self.catalog.films,
+                'persons': self.catalog.persons,
+                'genres': self.catalog.genres,
+                'persons_per_film': self.catalog.persons_per_film,
+                'genres_per_film': self.catalog.genres_per_film,
+                'seed': self.catalog.seed,
+            },
+            'repeat': self.repeat,
+            'results': results,
+        }
+
+    def bench_bulk_load(self) -> dict[str, Any]:
+        """Загрузка каталога `CatalogLoader` с синхронизацией в ES и MongoDB."""
+        records = list(self.catalog.records())
+        loader = CatalogLoader(self.batch_size)
+        result = self.measure(lambda: loader.load(records), repeat=1)
+        return self._with_rate(result, len(records), 'rows_per_second')
+
+    def bench_reindex(self) -> dict[str, Any]:
+        """
+        Полная переиндексация каждого индекса bulk-запросами. Документы отправляются
+        с `force`, иначе повторы пропускали бы их по отпечаткам и замер был бы пустым.
+        """
+        results = {}
+        for index in ('genres', 'persons', 'movies'):
+            sent: list[int] = []
+            result = self.measure(lambda: sent.append(index_changed_since(index, None, force=True)))
+            results[index] = self._with_rate(result, sent[-1], 'documents_per_second')
+        return results
+
+    def bench_documents(self) -> dict[str, Any]:
+        """Построение документов фильмов: только преобразование и вместе с запросами."""
+        filmwork_ids = self.catalog.film_ids
+        filmworks = list(elastic_service._filmwork_queryset().filter(id__in=filmwork_ids))
+        convert = self.measure(
+            lambda: [elastic_service._filmwork_to_document(filmwork) for filmwork in filmworks],
+        )
+        build = self.measure(lambda: elastic_service.build_filmwork_documents(filmwork_ids))
+        return {
+            'filmwork_to_document': self._with_rate(
+                convert, len(filmworks), 'documents_per_second'
+            ),
+            'build_filmwork_documents': self._with_rate(
+                build, len(filmwork_ids), 'documents_per_second'
+            ),
+        }
+
+    def bench_signals(self) -> dict[str, Any]:
+        """
+        Обработчики `movies.signals` вызываются напрямую вне транзакции, поэтому
+        в замер входит применение изменений к заглушкам ES и MongoDB. Перед каждым
+        вызовом `filmwork_saved` у фильма меняется поле: поле документа в
+        `filmwork_saved`, поле вне документа в `filmwork_saved_unchanged`.
+        """
+        filmwork = Filmwork.objects.get(id=self.catalog.film_ids[0])
+        person = (
+            Person.objects.filter(id__in=self.catalog.person_ids)
+            .annotate(films=Count('personfilmwork'))
+            .order_by('-films')
+            .first()
+        )
+        genre = (
+            Genre.objects.filter(id__in=self.catalog.genre_ids)
+            .annotate(films=Count('genrefilmwork'))
+            .order_by('-films')
+            .first()
+        )
+        genre_link = GenreFilmwork.objects.filter(film_work=filmwork).first()
+        person_link = PersonFilmwork.objects.filter(film_work=filmwork).first()
+        receivers: dict[str, Callable[[], Any]] = {
+            'filmwork_saved_created': lambda: signals.filmwork_saved(
+                Filmwork, filmwork, created=True
+            ),
+            'filmwork_saved': self._filmwork_saved(filmwork, 'rating', (5.0, 7.5)),
+            'filmwork_saved_unchanged': self._filmwork_saved(
+                filmwork, 'access_type', FilmworkAccessType.values
+            ),
+            'filmwork_deleted': lambda: signals.filmwork_deleted(Filmwork, filmwork),
+            'person_saved': lambda: signals.person_saved(Person, person, created=False),
+            'person_deleted': lambda: signals.person_deleted(Person, person),
+            'genre_saved': lambda: signals.genre_saved(Genre, genre, created=False),
+            'genre_deleted': lambda: signals.genre_deleted(Genre, genre),
+            'genrefilmwork_changed': lambda: signals.genrefilmwork_changed(
+                GenreFilmwork, genre_link
+            ),
+            'personfilmwork_changed': lambda: signals.personfilmwork_changed(
+                PersonFilmwork, person_link
+            ),
+        }
+        results = {name: self.measure(receiver) for name, receiver in receivers.items()}
+        unchanged = results['filmwork_saved_unchanged']
+        if unchanged['queries'] or unchanged['es_requests'] or unchanged['mongo_requests']:
+            raise RuntimeError(f'Изменение поля вне документа отправлено в хранилища: {unchanged}')
+        results['person_saved']['fan_out'] = person.films
+        results['genre_saved']['fan_out'] = genre.films
+        return results
+
+    def bench_changelist(self) -> dict[str, Any]:
+        """Отрисовка списков админки, включая поиск."""
+        pages = {
+            'filmwork': (Filmwork, '/admin/movies/filmwork/', {}),
+            'filmwork_search': (Filmwork, '/admin/movies/filmwork/', {'q': 'space prison'}),
+            'person': (Person, '/admin/movies/person/', {}),
+        }
+        results = {}
+        for name, (model, path, params) in pages.items():
+            request = self._admin_request(path, params)
+            model_admin = site._registry[model]
+            results[name] = self.measure(
+                lambda: model_admin.changelist_view(request).render()  # type: ignore[attr-defined]
+            )
+        return results
+
+    def measure(self, func: Callable[[], Any], repeat: int | None = None) -> dict[str, Any]:
+        """
+        Выполняет `func` несколько раз и возвращает медиану и минимум времени,
+        а также число запросов к PostgreSQL, Elasticsearch и MongoDB за один запуск.
+        """
+        timings = []
+        for _ in range(repeat or self.repeat):
+            es_requests = self.elasticsearch.requests
+            mongo_requests = self.mongo.requests
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+        return {
+            'seconds': statistics.median(timings),
+            'min_seconds': min(timings),
+            'queries': len(queries.captured_queries),
+            'es_requests': self.elasticsearch.requests - es_requests,
+            'mongo_requests': self.mongo.requests - mongo_requests,
+        }
+
+    @contextmanager
+    def _database(self) -> Iterator[None]:
+        """Временная база с миграциями вместо настроенной, удаляется после замеров"""
+        old_config = setup_databases(
+            verbosity=0,
+            interactive=False,
+            aliases={DEFAULT_DB_ALIAS: False},
+            serialized_aliases=set(),
+        )
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    @contextmanager
+    def _environment(self) -> Iterator[None]:
+        """Заглушки вместо внешних хранилищ и синхронизация сразу после изменений."""
+        sync_mode = settings.SYNC_MODE
+        settings.SYNC_MODE = 'inline'
+        try:
+            with use_clients(elasticsearch=self.elasticsearch, mongo=self.mongo):
+                yield
+        finally:
+            settings.SYNC_MODE = sync_mode
+
+    def _check_catalog(self) -> None:
+        """Переиндексация и списки охватывают все строки, поэтому в базе только каталог"""
+        counts = (Filmwork.objects.count(), Person.objects.count(), Genre.objects.count())
+        expected = (self.catalog.films, self.catalog.persons, self.catalog.genres)
+        if counts != expected:
+            raise RuntimeError(f'В базе бенчмарка {counts} строк вместо {expected}')
+
+    def _filmwork_saved(
+        self, filmwork: Filmwork, field: str, values: Iterable[Any]
+    ) -> Callable[[], None]:
+        """Обработчик сохранения фильма, перед которым поле каждый раз получает новое значение"""
+        current = getattr(filmwork, field)
+        candidates = cycle([value for value in values if value != current] + [current])
+
+        def receiver() -> None:
+            setattr(filmwork, field, next(candidates))
+            signals.filmwork_saved(Filmwork, filmwork, created=False)
+
+        return receiver
+
+    def _admin_request(self, path: str, params: dict[str, str]) -> HttpRequest:
+        request = RequestFactory().get(path, params)
+        request.user = User(is_active=True, is_staff=True, is_superuser=True)
+        request.resolver_match = resolve(path)
+        return request
+
+    def _with_rate(self, result: dict[str, Any], items: int, name: str) -> dict[str, Any]:
+        result['items'] = items
+        result[name] = items / result['seconds'] if result['seconds'] else None
+        return result
+
+    def _describe_environment(self) -> dict[str, Any]:
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'database_version': getattr(connection, 'pg_version', None),
+            'platform': platform.platform(),
+        }
@@ -0,0 +1,155 @@
+"""
+Общие клиенты Elasticsearch и MongoDB процесса.
+
+Клиенты создаются лениво при первом обращении и переиспользуют пул соединений.
+После fork (например, в воркерах gunicorn с `preload_app`) дочерний процесс
+забывает унаследованные клиенты и создаёт свои, при завершении процесса
+клиенты закрываются. Асинхронные клиенты привязаны к циклу событий ASGI-сервера
+и закрываются в нём через `aclose_clients`.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from elasticsearch import Elasticsearch
+from pymongo import AsyncMongoClient, MongoClient
+
+from config import settings
+from movies.metrics import InstrumentedHttpNode, MongoCommandMetrics
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients: dict[str, Any] = {}
+_pid = os.getpid()
+
+# Клиенты, которые закрываются корутиной в своём цикле событий
+ASYNC_CLIENTS = ('async_mongo',)
+
+
+def get_elasticsearch() -> Elasticsearch:
+    """Клиент Elasticsearch текущего процесса"""
+    return _get('elasticsearch', _create_elasticsearch)  # type: ignore[no-any-return]
+
+
+def get_mongo() -> MongoClient[Any]:
+    """Клиент MongoDB текущего процесса"""
+    return _get('mongo', _create_mongo)  # type: ignore[no-any-return]
+
+
+def get_async_mongo() -> AsyncMongoClient[Any]:
+    """Асинхронный клиент MongoDB текущего процесса для цикла событий ASGI-сервера"""
+    return _get('async_mongo', _create_async_mongo)  # type: ignore[no-any-return]
+
+
+def close_clients() -> None:
+    """Закрывает синхронные клиенты текущего процесса"""
+    with _lock:
+        _forget_foreign()
+        clients = [_clients.pop(name) for name in list(_clients) if name not in ASYNC_CLIENTS]
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.error(f'Ошибка закрытия клиента {client}: {e}')
+
+
+async def aclose_clients() -> None:
+    """Закрывает асинхронные клиенты текущего процесса"""
+    with _lock:
+        _forget_foreign()
+        clients = [_clients.pop(name) for name in ASYNC_CLIENTS if name in _clients]
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f'Ошибка закрытия клиента {client}: {e}')
+
+
+def reset_clients() -> None:
+    """Забывает клиенты, не закрывая их: соединения принадлежат родительскому процессу"""
+    global _lock, _pid
+    # Блокировка могла остаться захваченной потоком родителя в момент fork
+    _lock = threading.Lock()
+    _clients.clear()
+    _pid = os.getpid()
+
+
+@contextmanager
+def use_clients(**clients: Any) -> Iterator[None]:
+    """
+    Подменяет клиенты процесса на время блока, например, заглушками в бенчмарках.
+    Имена совпадают с ключами реестра: `elasticsearch`, `mongo`.
+    """
+    with _lock:
+        _forget_foreign()
+        previous = dict(_clients)
+        _clients.update(clients)
+    try:
+        yield
+    finally:
+        with _lock:
+            _clients.clear()
+            _clients.update(previous)
+
+
+def _get(name: str, factory: Any) -> Any:
+    client = _clients.get(name)
+    if client is not None and _pid == os.getpid():
+        return client
+    with _lock:
+        _forget_foreign()
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def _forget_foreign() -> None:
+    """Сбрасывает клиенты, унаследованные от родительского процесса"""
+    global _pid
+    if _pid != os.getpid():
+        _clients.clear()
+        _pid = os.getpid()
+
+
+def _create_elasticsearch() -> Elasticsearch:
+    return Elasticsearch(
+        f'http://{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}',
+        http_auth=(settings.ELASTICSEARCH_USER, settings.ELASTICSEARCH_PASSWORD),
+        connections_per_node=settings.ELASTICSEARCH_CONNECTIONS_PER_NODE,
+        http_compress=settings.ELASTICSEARCH_HTTP_COMPRESS,
+        request_timeout=settings.ELASTICSEARCH_REQUEST_TIMEOUT,
+        node_class=InstrumentedHttpNode,
+    )
+
+
+def _create_mongo() -> MongoClient[Any]:
+    return MongoClient(**_mongo_options())
+
+
+def _create_async_mongo() -> AsyncMongoClient[Any]:
+    return AsyncMongoClient(**_mongo_options())
+
+
+def _mongo_options() -> dict[str, Any]:
+    return dict(
+        host=settings.MONGO_HOST,
+        port=settings.MONGO_PORT,
+        username=settings.MONGO_USERNAME,
+        password=settings.MONGO_PASSWORD,
+        uuidRepresentation=settings.MONGO_UUID_REPRESENTATION,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        compressors=settings.MONGO_COMPRESSORS,
+        event_listeners=[MongoCommandMetrics()],
+    )
+
+
+os.register_at_fork(after_in_child=reset_clients)
+atexit.register(close_clients)
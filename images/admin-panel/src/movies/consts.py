@@ -1,2 +1,4 @@
 MAX_ENUM_STRING_LEN = 31
 MAX_STRING_LEN = 255
+# Конфигурация полнотекстового поиска, её же используют триггеры в миграциях
+SEARCH_CONFIG = 'english'
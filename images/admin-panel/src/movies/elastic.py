@@ -1,53 +1,500 @@
+import hashlib
+import json
 import logging
-from typing import Any
+import threading
+import time
+from collections.abc import Collection, Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Literal
 from uuid import UUID
 
 from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk, scan, streaming_bulk
+
+from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import (
+    Aggregate,
+    CharField,
+    Exists,
+    Field,
+    JSONField,
+    OuterRef,
+    Prefetch,
+    Q,
+    QuerySet,
+    Subquery,
+)
+from django.db.models.functions import Cast, JSONObject
+from django.utils import timezone
 
 from config import settings
-from movies.models import Filmwork, Genre, Person
+from movies import metrics
+from movies.clients import get_elasticsearch
+from movies.enums import PersonRole
+from movies.models import Filmwork, Genre, GenreFilmwork, IndexedDocument, Person, PersonFilmwork
+from movies.utils import chunked, iterate_keyset
 
 logger = logging.getLogger(__name__)
 
+# Настройки индекса на время массовой загрузки: без refresh и реплик,
+# с редкими flush транслога. По завершении индексу возвращаются прежние значения
+BULK_INDEX_SETTINGS = {
+    'refresh_interval': '-1',
+    'number_of_replicas': 0,
+    'translog.flush_threshold_size': settings.ELASTICSEARCH_BULK_TRANSLOG_FLUSH_THRESHOLD,
+}
+
+# Модели, из которых строятся документы индексов
+INDEX_MODELS: dict[str, type[Filmwork] | type[Person] | type[Genre]] = {
+    'movies': Filmwork,
+    'persons': Person,
+    'genres': Genre,
+}
+
+# Вложенные поля персон в документе фильма и роли, из которых они строятся
+PERSON_FIELDS = {
+    'actors': PersonRole.ACTOR,
+    'directors': PersonRole.DIRECTOR,
+    'writers': PersonRole.WRITER,
+}
+PERSON_ROLES = tuple(PERSON_FIELDS)
+
+# Переименование персон в документах фильмов: params.names — {id: новое имя}.
+# Скрипты `update_by_query` меняют документ без пересчёта, поэтому его отпечаток убирается
+RENAME_PERSONS_SCRIPT = """
+for (role in params.roles) {
+    List people = ctx._source[role];
+    if (people == null) {
+        continue;
+    }
+    List names = new ArrayList();
+    for (person in people) {
+        if (params.names.containsKey(person.id)) {
+            person.name = params.names[person.id];
+        }
+        names.add(person.name);
+    }
+    ctx._source[role + '_names'] = names;
+}
+ctx._source.remove('fingerprint');
+"""
+
+# Переименование жанров в документах фильмов: params.renames — {старое имя: новое}
+RENAME_GENRES_SCRIPT = """
+List genres = ctx._source.genres;
+for (int i = 0; i < genres.size(); i++) {
+    if (params.renames.containsKey(genres[i])) {
+        genres[i] = params.renames[genres[i]];
+    }
+}
+ctx._source.remove('fingerprint');
+"""
+
+# Удаление персон из документов фильмов: params.ids — id удалённых персон
+REMOVE_PERSONS_SCRIPT = """
+for (role in params.roles) {
+    List people = ctx._source[role];
+    if (people == null) {
+        continue;
+    }
+    people.removeIf(person -> params.ids.contains(person.id));
+    List names = new ArrayList();
+    for (person in people) {
+        names.add(person.name);
+    }
+    ctx._source[role + '_names'] = names;
+}
+ctx._source.remove('fingerprint');
+"""
+
+# Удаление жанров из документов фильмов: params.names — названия удалённых жанров
+REMOVE_GENRES_SCRIPT = """
+ctx._source.genres.removeIf(genre -> params.names.contains(genre));
+ctx._source.remove('fingerprint');
+"""
+
+
+def document_fingerprint(document: dict[str, Any]) -> str:
+    """
+    Отпечаток содержимого документа без поля `fingerprint`. Порядок элементов
+    списков не учитывается: связи фильма загружаются из базы без сортировки.
+    """
+    content = {key: value for key, value in document.items() if key != 'fingerprint'}
+    canonical = json.dumps(_canonical(content), sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def with_fingerprint(document: dict[str, Any]) -> dict[str, Any]:
+    """Документ с отпечатком в поле `fingerprint`, по которому сверка находит устаревшие"""
+    if 'fingerprint' in document:
+        return document
+    return {**document, 'fingerprint': document_fingerprint(document)}
+
+
+def record_fingerprints(index: str, fingerprints: Mapping[str, str], indexed_at: datetime) -> None:
+    """
+    Запоминает в `IndexedDocument` отпечатки документов, принятых индексом: по ним
+    синхронизация пропускает неизменённые документы, а сверка находит устаревшие
+    """
+    IndexedDocument.objects.bulk_create(
+        (
+            IndexedDocument(
+                index=index,
+                entity_id=entity_id,
+                fingerprint=fingerprint,
+                indexed_at=indexed_at,
+            )
+            for entity_id, fingerprint in fingerprints.items()
+        ),
+        update_conflicts=True,
+        unique_fields=['index', 'entity_id'],
+        update_fields=['fingerprint', 'indexed_at'],
+        batch_size=settings.SYNC_BATCH_SIZE,
+    )
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_canonical(item) for item in value]
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True, default=str))
+    return value
+
 
 class ElasticsearchStartUpService:
-    def __init__(self) -> None:
-        self.client = Elasticsearch(
-            f'http://{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}',
-            http_auth=(settings.ELASTICSEARCH_USER, settings.ELASTICSEARCH_PASSWORD),
-        )
+    """
+    Управляет версиями индексов.
+
+    Данные хранятся в физических индексах `<имя>_v<N>`, а клиенты обращаются
+    к постоянному алиасу `<имя>`. Новая версия строится в фоне и подключается
+    атомарной заменой алиаса, поэтому поиск не прерывается на время переиндексации.
+    """
+
+    @property
+    def client(self) -> Elasticsearch:
+        client: Elasticsearch = get_elasticsearch()
+        return client
 
     def create_indices(self) -> None:
-        """Создаёт индексы если они не существуют"""
-
-        for index_name, mapping in settings.ELASTICSEARCH_INDICES.items():
-            if not self.client.indices.exists(index=index_name):
-                try:
-                    body = {
-                        'settings': settings.ELASTICSEARCH_SETTINGS,
-                        'mappings': {'dynamic': 'strict', 'properties': mapping},
-                    }
-                    self.client.indices.create(index=index_name, body=body)
-                    logger.info(f'Создан индекс: {index_name}')
-                except Exception as e:
-                    logger.info(f'Индекс не создан: {index_name}')
-                    logger.error(f'Индекс не создан: {e}')
+        """Создаёт первые версии индексов под алиасами, если индексы не существуют"""
+
+        for index_name in settings.ELASTICSEARCH_INDICES:
+            if self.client.indices.exists(index=index_name):
+                if self.is_outdated(index_name):
+                    logger.warning(
+                        f'Схема индекса {index_name} устарела, '
+                        f'выполните команду rebuild_elastic',
+                    )
+                continue
+            try:
+                version = self._next_version(index_name)
+                body = self.index_body(index_name)
+                body['aliases'] = {index_name: {}}
+                self.client.indices.create(index=f'{index_name}_v{version}', body=body)
+                logger.info(f'Создан индекс: {index_name}_v{version}')
+            except Exception as e:
+                logger.info(f'Индекс не создан: {index_name}')
+                logger.error(f'Индекс не создан: {e}')
+
+    def index_body(self, index_name: str) -> dict[str, Any]:
+        """Настройки и схема индекса с отпечатком схемы в `_meta`"""
+        return {
+            'settings': settings.ELASTICSEARCH_SETTINGS,
+            'mappings': {
+                'dynamic': 'strict',
+                '_meta': {'fingerprint': self.fingerprint(index_name)},
+                'properties': settings.ELASTICSEARCH_INDICES[index_name],
+            },
+        }
+
+    def fingerprint(self, index_name: str) -> str:
+        """Отпечаток текущих настроек и схемы индекса"""
+        source = json.dumps(
+            [settings.ELASTICSEARCH_SETTINGS, settings.ELASTICSEARCH_INDICES[index_name]],
+            sort_keys=True,
+        )
+        return hashlib.sha1(source.encode()).hexdigest()
+
+    def is_outdated(self, index_name: str) -> bool:
+        """Проверяет, построен ли индекс по другой схеме"""
+        mappings = self.client.indices.get_mapping(index=index_name)
+        return any(
+            mapping['mappings'].get('_meta', {}).get('fingerprint') != self.fingerprint(index_name)
+            for mapping in mappings.values()
+        )
+
+    def versions(self, index_name: str) -> list[str]:
+        """Физические индексы алиаса в порядке возрастания версии"""
+        indices = self.client.indices.get(index=f'{index_name}_v*', allow_no_indices=True)
+        return sorted(indices, key=lambda name: int(name.rsplit('_v', 1)[1]))
+
+    def rebuild_index(
+        self,
+        index_name: str,
+        batch_size: int,
+        chunk_size: int = settings.ELASTICSEARCH_BULK_CHUNK_SIZE,
+        thread_count: int = settings.ELASTICSEARCH_BULK_THREADS,
+        keep: int = 1,
+        forcemerge: bool = False,
+    ) -> str:
+        """
+        Строит новую версию индекса в режиме `bulk_load`, проверяет число документов,
+        переключает на неё алиас и удаляет старые версии, оставляя `keep` предыдущих.
+        Изменения, записанные в старую версию во время построения, переносятся
+        повторной индексацией объектов, изменённых после начала построения,
+        а документы удалённых за это время объектов удаляются из новой версии.
+        Начало уменьшается на `SYNC_WATERMARK_OVERLAP`: `updated_at` — время начала
+        транзакции, и зафиксированные во время построения строки могут быть старше него.
+        После переключения отпечатки документов новой версии запоминаются
+        в `IndexedDocument`, чтобы сверка не считала их устаревшими.
+        Если перенести изменения не удалось, старые версии не удаляются.
+        """
+        started = timezone.now() - timedelta(seconds=settings.SYNC_WATERMARK_OVERLAP)
+        new_index = f'{index_name}_v{self._next_version(index_name)}'
+        self.client.indices.create(index=new_index, body=self.index_body(index_name))
+        logger.info(f'Строится индекс: {new_index}')
+        try:
+            indexed = 0
+            with self.bulk_load(new_index, forcemerge), elastic_service.bulk_mode():
+                for documents in elastic_service.iter_documents(index_name, batch_size):
+                    for ok, info in elastic_service.bulk_index(
+                        new_index, documents, chunk_size, thread_count
+                    ):
+                        if not ok:
+                            raise RuntimeError(f'Ошибка индексации в {new_index}: {info}')
+                        indexed += 1
+            self.client.indices.refresh(index=new_index)
+            count = self.client.count(index=new_index)['count']
+            if count != indexed:
+                raise RuntimeError(f'В {new_index} {count} документов вместо {indexed}')
+        except Exception:
+            self.client.indices.delete(index=new_index)
+            raise
+        self._switch_alias(index_name, new_index)
+        logger.info(f'Алиас {index_name} переключён на {new_index}: {indexed} документов')
+        self._record_fingerprints(index_name, new_index, started, batch_size)
+        errors: list[Any] = []
+        with elastic_service.bulk_mode():
+            for documents in elastic_service.iter_documents(index_name, batch_size, since=started):
+                errors += [
+                    info
+                    for ok, info in elastic_service.bulk_index(
+                        index_name, documents, chunk_size, 1, record=True
+                    )
+                    if not ok
+                ]
+            errors += self._remove_deleted(index_name, new_index, batch_size)
+        if errors:
+            raise RuntimeError(f'Изменения не перенесены в {new_index}: {errors}')
+        self._remove_old_versions(index_name, keep)
+        return new_index
+
+    @contextmanager
+    def bulk_load(self, index: str, forcemerge: bool = False) -> Iterator[None]:
+        """
+        Применяет к индексу настройки массовой загрузки и при выходе, в том числе
+        по ошибке, возвращает значения, которые были у индекса до загрузки.
+        При `forcemerge` после успешной загрузки сегменты сливаются в один
+        до возврата реплик, чтобы те копировали готовый индекс
+        """
+        saved = self.current_settings(index)
+        self.client.indices.put_settings(index=index, settings=BULK_INDEX_SETTINGS)
+        logger.info(f'Индекс {index} переведён в режим массовой загрузки')
+        try:
+            yield
+            if forcemerge:
+                self.client.indices.refresh(index=index)
+                started = time.monotonic()
+                self.client.options(
+                    request_timeout=settings.ELASTICSEARCH_FORCEMERGE_TIMEOUT
+                ).indices.forcemerge(index=index, max_num_segments=1)
+                logger.info(f'Сегменты индекса {index} слиты за {time.monotonic() - started:.1f} с')
+        finally:
+            for name, values in saved.items():
+                self.client.indices.put_settings(index=name, settings=values)
+            logger.info(f'Индексу {index} возвращены прежние настройки')
+
+    def current_settings(self, index: str) -> dict[str, dict[str, Any]]:
+        """
+        Текущие значения настроек массовой загрузки физических индексов `index`.
+        None — настройка не задана явно и при возврате сбрасывается к умолчанию
+        """
+        response = self.client.indices.get_settings(index=index, flat_settings=True)
+        return {
+            name: {key: body['settings'].get(f'index.{key}') for key in BULK_INDEX_SETTINGS}
+            for name, body in response.items()
+        }
+
+    def _record_fingerprints(
+        self,
+        index_name: str,
+        new_index: str,
+        indexed_at: datetime,
+        batch_size: int,
+    ) -> None:
+        """
+        Запоминает отпечатки документов новой версии на момент начала построения.
+        Объекты, изменённые позже, считаются изменёнными после отправки, пока их
+        не перенесёт повторная индексация. Документы без отпечатка, частично
+        обновлённые после переключения, не запоминаются
+        """
+        hits = scan(
+            self.client,
+            index=new_index,
+            query={'query': {'match_all': {}}},
+            _source=['fingerprint'],
+            size=batch_size,
+        )
+        for chunk in chunked(hits, batch_size):
+            fingerprints = {hit['_id']: hit.get('_source', {}).get('fingerprint') for hit in chunk}
+            record_fingerprints(
+                index_name,
+                {entity_id: value for entity_id, value in fingerprints.items() if value},
+                indexed_at,
+            )
+
+    def _remove_deleted(self, index_name: str, new_index: str, batch_size: int) -> list[Any]:
+        """
+        Удаляет из новой версии документы объектов, удалённых во время её построения.
+        Возвращает ошибки
+        """
+        model = INDEX_MODELS[index_name]
+        hits = scan(self.client, index=new_index, query={'query': {'match_all': {}}}, _source=False)
+        errors = []
+        for chunk in chunked((UUID(hit['_id']) for hit in hits), batch_size):
+            existing = set(model._default_manager.filter(id__in=chunk).values_list('id', flat=True))
+            deleted = [entity_id for entity_id in chunk if entity_id not in existing]
+            if deleted:
+                logger.info(
+                    f'Из {new_index} удаляются документы удалённых объектов: {len(deleted)}'
+                )
+                errors += elastic_service.bulk_delete(index_name, deleted)
+        return errors
+
+    def _next_version(self, index_name: str) -> int:
+        versions = self.versions(index_name)
+        return int(versions[-1].rsplit('_v', 1)[1]) + 1 if versions else 1
+
+    def _switch_alias(self, index_name: str, new_index: str) -> None:
+        """Атомарно переводит алиас на новую версию индекса"""
+        actions: list[dict[str, Any]] = []
+        if self.client.indices.exists_alias(name=index_name):
+            for index in self.client.indices.get_alias(name=index_name):
+                actions.append({'remove': {'index': index, 'alias': index_name}})
+        elif self.client.indices.exists(index=index_name):
+            # Индекс, созданный до перехода на версии, заменяется алиасом
+            actions.append({'remove_index': {'index': index_name}})
+        actions.append({'add': {'index': new_index, 'alias': index_name}})
+        self.client.indices.update_aliases(actions=actions)
+
+    def _remove_old_versions(self, index_name: str, keep: int) -> None:
+        """Удаляет старые версии индекса, не подключённые к алиасу"""
+        active = set(self.client.indices.get_alias(name=index_name))
+        old = [index for index in self.versions(index_name) if index not in active]
+        for index in old[: max(len(old) - keep, 0)]:
+            self.client.indices.delete(index=index)
+            logger.info(f'Удалена старая версия индекса: {index}')
+
+
+class RefreshPolicy:
+    """
+    Политика обновления (refresh) индексов после записи.
+
+    `true` — refresh после каждой записи, `wait_for` — запись ждёт ближайшего
+    refresh индекса, `false` — документы станут видны по `refresh_interval` индекса,
+    `interval` — не чаще одного явного refresh индекса в `interval` секунд.
+    В режиме bulk (`ElasticsearchService.bulk_mode`) refresh отключён
+    и выполняется один раз по завершении.
+    """
+
+    MODES = ('true', 'wait_for', 'false', 'interval')
+
+    def __init__(self, mode: str, interval: float) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f'Неизвестная политика refresh: {mode}')
+        self.mode = mode
+        self.interval = interval
+        self._refreshed_at: dict[str, float] = {}
+        self._local = threading.local()
+
+    @property
+    def bulk_indices(self) -> set[str] | None:
+        """Индексы, записанные в текущем режиме bulk, или None вне его"""
+        return getattr(self._local, 'bulk_indices', None)
+
+    def begin_bulk(self) -> None:
+        """Включает режим bulk для текущего потока"""
+        self._local.bulk_indices = set()
+
+    def end_bulk(self) -> set[str]:
+        """Выключает режим bulk и возвращает индексы, которые нужно обновить"""
+        indices = self.bulk_indices or set()
+        self._local.bulk_indices = None
+        return indices
+
+    def param(self) -> bool | Literal['wait_for']:
+        """Значение параметра `refresh` для запросов записи"""
+        if self.bulk_indices is not None:
+            return False
+        if self.mode == 'true':
+            return True
+        if self.mode == 'wait_for':
+            return 'wait_for'
+        return False
+
+    def after_write(self, client: Elasticsearch, index: str) -> None:
+        """Учитывает запись в индекс и при необходимости обновляет его"""
+        if self.bulk_indices is not None:
+            self.bulk_indices.add(index)
+            return
+        if self.mode != 'interval':
+            return
+        now = time.monotonic()
+        if now - self._refreshed_at.get(index, 0.0) >= self.interval:
+            self._refreshed_at[index] = now
+            client.indices.refresh(index=index)
 
 
 class ElasticsearchService:
     """Сервис для работы с Elasticsearch из админ-панели"""
 
     def __init__(self) -> None:
-        self.client = Elasticsearch(
-            f'http://{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}',
-            http_auth=(settings.ELASTICSEARCH_USER, settings.ELASTICSEARCH_PASSWORD),
+        self.refresh = RefreshPolicy(
+            settings.ELASTICSEARCH_REFRESH,
+            settings.ELASTICSEARCH_REFRESH_INTERVAL,
         )
 
+    @property
+    def client(self) -> Elasticsearch:
+        """Общий клиент процесса, создаётся при первом обращении"""
+        client: Elasticsearch = get_elasticsearch()
+        return client
+
+    @contextmanager
+    def bulk_mode(self) -> Iterator[None]:
+        """Отключает refresh на время массовой записи и обновляет индексы один раз в конце"""
+        if self.refresh.bulk_indices is not None:
+            yield
+            return
+        self.refresh.begin_bulk()
+        try:
+            yield
+        finally:
+            indices = self.refresh.end_bulk()
+            if indices:
+                self.client.indices.refresh(index=','.join(sorted(indices)))
+
     def index_filmwork(self, filmwork: Filmwork) -> bool:
         """Индексирует фильм в Elasticsearch"""
         try:
             doc = self._filmwork_to_document(filmwork)
-            self.client.index(index='movies', id=str(filmwork.id), body=doc, refresh=True)
+            self.client.index(
+                index='movies', id=str(filmwork.id), body=doc, refresh=self.refresh.param()
+            )
+            self.refresh.after_write(self.client, 'movies')
             logger.info(f'Фильм индексирован: {filmwork.title}')
             return True
         except Exception as e:
@@ -57,8 +504,11 @@ class ElasticsearchService:
     def index_person(self, person: Person) -> bool:
         """Индексирует персону в Elasticsearch"""
         try:
-            doc = {'id': str(person.id), 'full_name': person.full_name}
-            self.client.index(index='persons', id=str(person.id), body=doc, refresh=True)
+            doc = self._person_to_document(person)
+            self.client.index(
+                index='persons', id=str(person.id), body=doc, refresh=self.refresh.param()
+            )
+            self.refresh.after_write(self.client, 'persons')
             logger.info(f'Персона индексирована: {person.full_name}')
             return True
         except Exception as e:
@@ -68,8 +518,11 @@ class ElasticsearchService:
     def index_genre(self, genre: Genre) -> bool:
         """Индексирует жанр в Elasticsearch"""
         try:
-            doc = {'id': str(genre.id), 'name': genre.name, 'description': genre.description or ''}
-            self.client.index(index='genres', id=str(genre.id), body=doc, refresh=True)
+            doc = self._genre_to_document(genre)
+            self.client.index(
+                index='genres', id=str(genre.id), body=doc, refresh=self.refresh.param()
+            )
+            self.refresh.after_write(self.client, 'genres')
             logger.info(f'Жанр индексирован: {genre.name}')
             return True
         except Exception as e:
@@ -79,7 +532,8 @@ class ElasticsearchService:
     def delete_filmwork(self, filmwork_id: UUID) -> bool:
         """Удаляет фильм из Elasticsearch"""
         try:
-            self.client.delete(index='movies', id=str(filmwork_id), refresh=True)
+            self.client.delete(index='movies', id=str(filmwork_id), refresh=self.refresh.param())
+            self.refresh.after_write(self.client, 'movies')
             logger.info(f'Фильм удалён из индекса: {filmwork_id}')
             return True
         except Exception as e:
@@ -89,7 +543,8 @@ class ElasticsearchService:
     def delete_genre(self, genre_id: UUID) -> bool:
         """Удаляет жанр из Elasticsearch"""
         try:
-            self.client.delete(index='genres', id=str(genre_id), refresh=True)
+            self.client.delete(index='genres', id=str(genre_id), refresh=self.refresh.param())
+            self.refresh.after_write(self.client, 'genres')
             logger.info(f'Жанр удалён из индекса: {genre_id}')
             return True
         except Exception as e:
@@ -99,17 +554,322 @@ class ElasticsearchService:
     def delete_person(self, person_id: UUID) -> bool:
         """Удаляет персону из Elasticsearch"""
         try:
-            self.client.delete(index='persons', id=str(person_id), refresh=True)
+            self.client.delete(index='persons', id=str(person_id), refresh=self.refresh.param())
+            self.refresh.after_write(self.client, 'persons')
             logger.info(f'Персона удалена из индекса: {person_id}')
             return True
         except Exception as e:
             logger.error(f'Ошибка удаления персоны {person_id}: {e}')
             return False
 
+    def bulk_index(
+        self,
+        index: str,
+        documents: Collection[dict[str, Any]],
+        chunk_size: int = settings.ELASTICSEARCH_BULK_CHUNK_SIZE,
+        thread_count: int = settings.ELASTICSEARCH_BULK_THREADS,
+        record: bool = False,
+    ) -> Iterator[tuple[bool, Any]]:
+        """
+        Отправляет документы в индекс через bulk API в несколько потоков.
+        Документы должны быть построены заранее: потоки пула не работают с базой данных.
+        Документы без отпечатка получают его в поле `fingerprint`. С `record`
+        отпечатки принятых документов запоминаются в `IndexedDocument`.
+        """
+        metrics.record_batch('elasticsearch', 'bulk_index', len(documents))
+        indexed_at = timezone.now()
+        documents = [with_fingerprint(doc) for doc in documents]
+        actions = ({'_index': index, '_id': doc['id'], '_source': doc} for doc in documents)
+        failed = set()
+        for ok, info in parallel_bulk(
+            self.client,
+            actions,
+            thread_count=thread_count,
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            refresh=self.refresh.param(),
+        ):
+            if not ok:
+                metrics.record_error('elasticsearch', 'bulk_index_item')
+                failed.add(info['index']['_id'])
+            yield ok, info
+        self.refresh.after_write(self.client, index)
+        if record:
+            record_fingerprints(
+                index,
+                {doc['id']: doc['fingerprint'] for doc in documents if doc['id'] not in failed},
+                indexed_at,
+            )
+
+    def bulk_delete(
+        self,
+        index: str,
+        ids: Collection[UUID],
+        chunk_size: int = settings.ELASTICSEARCH_BULK_CHUNK_SIZE,
+    ) -> list[Any]:
+        """Удаляет документы из индекса через bulk API и возвращает ошибки"""
+        metrics.record_batch('elasticsearch', 'bulk_delete', len(ids))
+        actions = ({'_op_type': 'delete', '_index': index, '_id': str(id)} for id in ids)
+        errors = []
+        for ok, info in streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            refresh=self.refresh.param(),
+        ):
+            # Отсутствующий документ уже удалён
+            if not ok and info['delete'].get('status') != 404:
+                metrics.record_error('elasticsearch', 'bulk_delete_item')
+                errors.append(info)
+        self.refresh.after_write(self.client, index)
+        return errors
+
+    def bulk_update(
+        self,
+        index: str,
+        documents: Collection[dict[str, Any]],
+        chunk_size: int = settings.ELASTICSEARCH_BULK_CHUNK_SIZE,
+    ) -> tuple[list[Any], list[str]]:
+        """
+        Частично обновляет документы через bulk API: передаются только поля из
+        `documents`. Возвращает ошибки и id документов, которых нет в индексе.
+        """
+        metrics.record_batch('elasticsearch', 'bulk_update', len(documents))
+        actions = (
+            {
+                '_op_type': 'update',
+                '_index': index,
+                '_id': document['id'],
+                'doc': {key: value for key, value in document.items() if key != 'id'},
+            }
+            for document in documents
+        )
+        errors = []
+        missing = []
+        for ok, info in streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            refresh=self.refresh.param(),
+        ):
+            if ok:
+                continue
+            if info['update'].get('status') == 404:
+                missing.append(info['update']['_id'])
+            else:
+                metrics.record_error('elasticsearch', 'bulk_update_item')
+                errors.append(info)
+        self.refresh.after_write(self.client, index)
+        return errors, missing
+
+    def rename_persons(self, names: dict[str, str]) -> list[Any]:
+        """
+        Обновляет имена персон в документах фильмов одним `update_by_query`,
+        не перестраивая документы. Возвращает ошибки.
+        """
+        return self._update_by_query(
+            self._persons_query(names),
+            RENAME_PERSONS_SCRIPT,
+            {'names': names, 'roles': PERSON_ROLES},
+        )
+
+    def rename_genres(self, renames: dict[str, str]) -> list[Any]:
+        """Заменяет старые названия жанров на новые в документах фильмов. Возвращает ошибки"""
+        query = {'terms': {'genres': list(renames)}}
+        return self._update_by_query(query, RENAME_GENRES_SCRIPT, {'renames': renames})
+
+    def remove_persons(self, ids: Collection[str]) -> list[Any]:
+        """Убирает удалённых персон из документов фильмов. Возвращает ошибки"""
+        return self._update_by_query(
+            self._persons_query(ids),
+            REMOVE_PERSONS_SCRIPT,
+            {'ids': list(ids), 'roles': PERSON_ROLES},
+        )
+
+    def remove_genres(self, names: Collection[str]) -> list[Any]:
+        """Убирает удалённые жанры из документов фильмов по названиям. Возвращает ошибки"""
+        query = {'terms': {'genres': list(names)}}
+        return self._update_by_query(query, REMOVE_GENRES_SCRIPT, {'names': list(names)})
+
+    def indexed_names(self, index: str, field: str, ids: Collection[str]) -> dict[str, str]:
+        """Значения поля документов индекса одним запросом `mget`"""
+        response = self.client.mget(index=index, ids=list(ids), source_includes=[field])
+        return {
+            document['_id']: document['_source'][field]
+            for document in response['docs']
+            if document.get('found')
+        }
+
+    def _persons_query(self, ids: Collection[str]) -> dict[str, Any]:
+        """Фильмы, в которых участвует хотя бы одна из персон в любой роли"""
+        return {
+            'bool': {
+                'should': [
+                    {'nested': {'path': role, 'query': {'terms': {f'{role}.id': list(ids)}}}}
+                    for role in PERSON_ROLES
+                ],
+                'minimum_should_match': 1,
+            },
+        }
+
+    def _update_by_query(
+        self,
+        query: dict[str, Any],
+        script: str,
+        params: dict[str, Any],
+    ) -> list[Any]:
+        response = self.client.update_by_query(
+            index='movies',
+            query=query,
+            script={'source': script, 'lang': 'painless', 'params': params},
+            conflicts='proceed',
+            slices='auto',
+            refresh=bool(self.refresh.param()),
+        )
+        self.refresh.after_write(self.client, 'movies')
+        return list(response.get('failures', []))
+
+    def build_filmwork_documents(self, filmwork_ids: Collection[UUID]) -> list[dict[str, Any]]:
+        """Строит документы указанных фильмов одним запросом"""
+        return list(self.iter_filmwork_documents(Filmwork.objects.filter(id__in=filmwork_ids)))
+
+    def iter_filmwork_documents(
+        self,
+        queryset: QuerySet[Filmwork],
+        chunk_size: int = settings.SYNC_CHUNK_SIZE,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Строит документы фильмов из `queryset` одним SQL-запросом: жанры и участники
+        по ролям агрегируются в PostgreSQL коррелированными подзапросами, а строки
+        читаются серверным курсором по `chunk_size`. Подходит для синхронизации,
+        переиндексации и выгрузки.
+        """
+        rows = (
+            queryset.annotate(
+                genre_names=self._aggregated(
+                    GenreFilmwork.objects.all(),
+                    ArrayAgg('genre__name', ordering='genre__name'),
+                    ArrayField(CharField()),
+                ),
+                **{
+                    field: self._aggregated(
+                        PersonFilmwork.objects.filter(role=role),
+                        JSONBAgg(
+                            JSONObject(id=Cast('person_id', CharField()), name='person__full_name'),
+                            ordering=('person__full_name', 'person_id'),
+                        ),
+                        JSONField(),
+                    )
+                    for field, role in PERSON_FIELDS.items()
+                },
+            )
+            .values('id', *Filmwork.document_fields, 'genre_names', *PERSON_FIELDS)
+            .iterator(chunk_size=chunk_size)
+        )
+        for row in rows:
+            people = {field: row[field] or [] for field in PERSON_FIELDS}
+            yield {
+                'id': str(row['id']),
+                **self._filmwork_scalars(row),
+                'genres': row['genre_names'] or [],
+                **people,
+                **{
+                    f'{field}_names': [person['name'] for person in persons]
+                    for field, persons in people.items()
+                },
+            }
+
+    def iter_documents(
+        self,
+        index: str,
+        batch_size: int,
+        since: datetime | None = None,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Строит документы индекса пачками, загружая связи одним запросом на пачку.
+        Если указан `since`, строит только документы, изменившиеся после этого момента.
+        """
+        if index == 'movies':
+            queryset = Filmwork.objects.order_by('id')
+            if since is not None:
+                queryset = queryset.filter(self._filmwork_changed_since(since))
+            yield from chunked(self.iter_filmwork_documents(queryset, batch_size), batch_size)
+        elif index == 'persons':
+            persons = Person.objects.all()
+            if since is not None:
+                persons = persons.filter(updated_at__gte=since)
+            for batch in iterate_keyset(persons, batch_size):
+                yield [self._person_to_document(person) for person in batch]
+        elif index == 'genres':
+            genres = Genre.objects.all()
+            if since is not None:
+                genres = genres.filter(updated_at__gte=since)
+            for batch in iterate_keyset(genres, batch_size):
+                yield [self._genre_to_document(genre) for genre in batch]
+        else:
+            raise ValueError(f'Неизвестный индекс: {index}')
+
+    def build_filmwork_partial_documents(
+        self,
+        filmwork_ids: Collection[UUID],
+    ) -> list[dict[str, Any]]:
+        """Строит документы из скалярных полей фильмов одним запросом, без связей"""
+        rows = Filmwork.objects.filter(id__in=filmwork_ids).values('id', *Filmwork.document_fields)
+        return [{'id': str(row['id']), **self._filmwork_scalars(row)} for row in rows]
+
+    def _aggregated(
+        self,
+        links: QuerySet[Any],
+        aggregate: Aggregate,
+        output_field: 'Field[Any, Any]',
+    ) -> Subquery:
+        """Агрегат по связям фильма коррелированным подзапросом"""
+        return Subquery(
+            links.filter(film_work=OuterRef('pk'))
+            .values('film_work')
+            .annotate(aggregated=aggregate)
+            .values('aggregated'),
+            output_field=output_field,
+        )
+
+    def _filmwork_changed_since(self, since: datetime) -> Q:
+        """Фильмы, изменённые сами или через связанные персоны и жанры"""
+        persons = PersonFilmwork.objects.filter(film_work=OuterRef('pk')).filter(
+            Q(created_at__gte=since) | Q(person__updated_at__gte=since),
+        )
+        genres = GenreFilmwork.objects.filter(film_work=OuterRef('pk')).filter(
+            Q(created_at__gte=since) | Q(genre__updated_at__gte=since),
+        )
+        return Q(updated_at__gte=since) | Q(Exists(persons)) | Q(Exists(genres))
+
+    def _filmwork_queryset(self) -> QuerySet[Filmwork]:
+        """Фильмы вместе с жанрами и участниками, нужными для документа"""
+        queryset: QuerySet[Filmwork] = Filmwork.objects.prefetch_related(
+            'genres',
+            Prefetch(
+                'personfilmwork_set', queryset=PersonFilmwork.objects.select_related('person')
+            ),
+        )
+        return queryset
+
+    def _person_to_document(self, person: Person) -> dict[str, Any]:
+        """Преобразует Django модель Person в документ Elasticsearch"""
+        return {'id': str(person.id), 'full_name': person.full_name}
+
+    def _genre_to_document(self, genre: Genre) -> dict[str, Any]:
+        """Преобразует Django модель Genre в документ Elasticsearch"""
+        return {'id': str(genre.id), 'name': genre.name, 'description': genre.description or ''}
+
     def _filmwork_to_document(self, filmwork: Filmwork) -> dict[str, Any]:
         """Преобразует Django модель Filmwork в документ Elasticsearch"""
         genres = list(filmwork.genres.all())
-        persons = filmwork.personfilmwork_set.select_related('person').all()
+        if 'personfilmwork_set' in getattr(filmwork, '_prefetched_objects_cache', {}):
+            # Используем связи, загруженные через prefetch_related
+            persons = filmwork.personfilmwork_set.all()
+        else:
+            persons = filmwork.personfilmwork_set.select_related('person').all()
         actors = []
         directors = []
         writers = []
@@ -123,12 +883,9 @@ class ElasticsearchService:
                 writers.append(person_data)
         return {
             'id': str(filmwork.id),
-            'title': filmwork.title,
-            'description': filmwork.description or '',
-            'rating': filmwork.rating or 0.0,
-            'release_date': filmwork.release_date.isoformat() if filmwork.release_date else None,
-            'type': filmwork.type,
-            'age_rating': filmwork.age_rating,
+            **self._filmwork_scalars(
+                {field: getattr(filmwork, field) for field in Filmwork.document_fields},
+            ),
             'genres': [genre.name for genre in genres],
             'actors': actors,
             'directors': directors,
@@ -138,5 +895,17 @@ class ElasticsearchService:
             'writers_names': [p['name'] for p in writers],
         }
 
+    def _filmwork_scalars(self, values: Mapping[str, Any]) -> dict[str, Any]:
+        """Поля документа фильма из значений `Filmwork.document_fields`"""
+        release_date = values['release_date']
+        return {
+            'title': values['title'],
+            'description': values['description'] or '',
+            'rating': values['rating'] or 0.0,
+            'release_date': release_date.isoformat() if release_date else None,
+            'type': values['type'],
+            'age_rating': values['age_rating'],
+        }
+
 
 elastic_service = ElasticsearchService()
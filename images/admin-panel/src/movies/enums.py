@@ -31,3 +31,21 @@ class PersonRole(models.TextChoices):
     ACTOR = 'actor'
     DIRECTOR = 'director'
     WRITER = 'writer'
+
+
+class SyncEntity(models.TextChoices):
+    """Тип сущности, синхронизируемой с Elasticsearch и MongoDB."""
+
+    FILMWORK = 'filmwork'
+    PERSON = 'person'
+    GENRE = 'genre'
+
+
+class SyncOperation(models.TextChoices):
+    """Операция синхронизации."""
+
+    # Изменились только скалярные поля документа фильма
+    UPDATE = 'update'
+    CREATE = 'create'
+    INDEX = 'index'
+    DELETE = 'delete'
@@ -0,0 +1,340 @@
+import csv
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, TextIO
+from uuid import UUID
+
+from django.core import serializers
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Model
+from django.utils import timezone
+
+from config import settings
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from movies.sync import index_changed_since, provision_filmworks
+from movies.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+JSON_SEPARATORS = ' \t\r\n,'
+
+# Разделитель списка жанров в CSV-фиде
+CSV_LIST_SEPARATOR = '|'
+
+
+def iter_json_array(stream: TextIO, read_size: int = 1 << 16) -> Iterator[Any]:
+    """Читает элементы JSON-массива по одному, не загружая файл в память целиком"""
+    decoder = json.JSONDecoder()
+    buffer = stream.read(read_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив')
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip(JSON_SEPARATORS)
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # Элемент прочитан не полностью
+            if eof:
+                raise
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_feed(stream: TextIO, path: str) -> Iterator[dict[str, Any]]:
+    """Построчно читает фид: CSV с заголовком, если расширение .csv, иначе JSON Lines"""
+    if Path(path).suffix.lower() == '.csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def sync_changed_since(since: datetime, batch_size: int) -> Counter[str]:
+    """Строит индексы и документы MongoDB для объектов, изменённых после `since`"""
+    counts: Counter[str] = Counter()
+    for index in ('genres', 'persons', 'movies'):
+        counts[f'es:{index}'] = index_changed_since(index, since, batch_size)
+    counts['mongo:filmworks'] = provision_filmworks(since, batch_size)
+    return counts
+
+
+class CatalogLoader:
+    """
+    Загружает записи фикстуры каталога пачками через `bulk_create`.
+
+    Сигналы синхронизации при этом не отправляются: после загрузки индексы
+    Elasticsearch и документы MongoDB строятся один раз bulk-запросами
+    по объектам, изменённым с начала загрузки.
+    """
+
+    def __init__(self, batch_size: int = settings.SYNC_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self.counts: Counter[str] = Counter()
+        self._buffers: dict[type[Model], list[Model]] = {}
+
+    def load(self, records: Iterable[dict[str, Any]]) -> None:
+        """Сохраняет записи в одной транзакции и синхронизирует их с ES и MongoDB"""
+        started = timezone.now()
+        with transaction.atomic():
+            # Внешние ключи в PostgreSQL проверяются при фиксации транзакции,
+            # поэтому порядок моделей в фикстуре не важен
+            for deserialized in serializers.deserialize('python', records):
+                self._add(deserialized.object)
+            for model in list(self._buffers):
+                self._flush(model)
+        self.sync(started)
+
+    def sync(self, since: Any) -> None:
+        """Строит индексы и документы MongoDB для загруженных объектов"""
+        self.counts.update(sync_changed_since(since, self.batch_size))
+
+    def _add(self, obj: Model) -> None:
+        buffer = self._buffers.setdefault(type(obj), [])
+        buffer.append(obj)
+        if len(buffer) >= self.batch_size:
+            self._flush(type(obj))
+
+    def _flush(self, model: type[Model]) -> None:
+        objs = self._buffers.pop(model, [])
+        if not objs:
+            return
+        update_fields = [
+            field.name
+            for field in model._meta.concrete_fields
+            if not field.primary_key and field.name != 'created_at'
+        ]
+        model._default_manager.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=update_fields,
+        )
+        self.counts[model._meta.label_lower] += len(objs)
+
+
+class FeedImporter:
+    """
+    Импортирует фиды партнёров: фильмы и участие персон в фильмах.
+
+    Строка фида фильмов: `id`, `title`, `description`, `release_date`, `rating`,
+    `type`, `age_rating`, `genres` (список, в CSV — через `|`). Строка фида
+    участия: `film_id`, `full_name`, `role`. Значения проверяются полями моделей,
+    включая допустимые `type`, `age_rating` и `role`; строки с ошибками отклоняются.
+    Поля, которых нет в строке, у существующего фильма не перезаписываются.
+    Жанры и персоны находятся по названию и имени, недостающие создаются.
+    Строки пишутся пачками через `bulk_create` без сигналов, каждая пачка
+    в своей транзакции, связи не дублируются при повторном импорте. Фид читается
+    потоково, а персоны разрешаются по пачке, поэтому память не зависит
+    от размера фида. После импорта, в том числе прерванного ошибкой, ES и MongoDB
+    синхронизируются один раз по записанным пачкам.
+    """
+
+    def __init__(self, batch_size: int = settings.SYNC_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self.counts: Counter[str] = Counter()
+        self.seconds: defaultdict[str, float] = defaultdict(float)
+        self._genres: dict[str, UUID] = {}
+
+    def run(
+        self,
+        films: Iterable[dict[str, Any]] = (),
+        credits: Iterable[dict[str, Any]] = (),
+    ) -> None:
+        started = timezone.now()
+        try:
+            for rows in chunked(self._read(films, 'read:films'), self.batch_size):
+                with transaction.atomic():
+                    self._import_films(rows)
+            for rows in chunked(self._read(credits, 'read:credits'), self.batch_size):
+                with transaction.atomic():
+                    self._import_credits(rows)
+        except BaseException:
+            # Записанные пачки синхронизируются, но наружу уходит ошибка импорта
+            try:
+                self._sync(started)
+            except Exception as e:
+                logger.error(f'Не удалось синхронизировать прерванный импорт: {e}')
+            raise
+        self._sync(started)
+
+    def rates(self) -> dict[str, tuple[int, float, float]]:
+        """Число строк, время и строки в секунду по этапам"""
+        return {
+            stage: (self.counts[stage], seconds, self.counts[stage] / seconds if seconds else 0.0)
+            for stage, seconds in self.seconds.items()
+        }
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.monotonic() - started
+
+    def _sync(self, since: datetime) -> None:
+        """Синхронизирует ES и MongoDB по объектам, записанным после `since`"""
+        with self._stage('sync'):
+            synced = sync_changed_since(since, self.batch_size)
+        self.counts.update(synced)
+        self.counts['sync'] = sum(synced.values())
+
+    def _read(self, rows: Iterable[dict[str, Any]], stage: str) -> Iterator[dict[str, Any]]:
+        """Отдаёт строки фида, учитывая время чтения и разбора как отдельный этап"""
+        iterator = iter(rows)
+        while True:
+            with self._stage(stage):
+                row = next(iterator, None)
+            if row is None:
+                return
+            self.counts[stage] += 1
+            yield row
+
+    def _import_films(self, rows: list[dict[str, Any]]) -> None:
+        # Фильмы группируются по набору полей строки: обновляются только они.
+        # Повтор id в пачке заменяет предыдущую строку, иначе upsert изменил бы фильм дважды
+        filmworks: dict[UUID, Filmwork] = {}
+        provided: dict[UUID, frozenset[str]] = {}
+        genre_names: dict[UUID, list[str]] = {}
+        for row in rows:
+            parsed = self._filmwork(row)
+            if parsed is None:
+                self.counts['skipped:films'] += 1
+                continue
+            filmwork, fields = parsed
+            filmworks[filmwork.id] = filmwork
+            provided[filmwork.id] = fields
+            genre_names[filmwork.id] = self._names(row.get('genres'))
+        groups: dict[frozenset[str], list[Filmwork]] = {}
+        for filmwork_id, filmwork in filmworks.items():
+            groups.setdefault(provided[filmwork_id], []).append(filmwork)
+
+        with self._stage('genres'):
+            genre_ids = self._resolve_genres(
+                {name for names in genre_names.values() for name in names},
+            )
+        with self._stage('films'):
+            for fields, group in groups.items():
+                Filmwork.objects.bulk_create(
+                    group,
+                    update_conflicts=True,
+                    unique_fields=['id'],
+                    update_fields=[*sorted(fields), 'updated_at'],
+                )
+            self.counts['films'] += len(filmworks)
+        with self._stage('film_genres'):
+            links = [
+                GenreFilmwork(film_work_id=filmwork_id, genre_id=genre_ids[name])
+                for filmwork_id, names in genre_names.items()
+                for name in names
+            ]
+            GenreFilmwork.objects.bulk_create(links, ignore_conflicts=True)
+            self.counts['film_genres'] += len(links)
+
+    def _import_credits(self, rows: list[dict[str, Any]]) -> None:
+        full_name_field = Person._meta.get_field('full_name')
+        role_field = PersonFilmwork._meta.get_field('role')
+        credits = set()
+        for row in rows:
+            try:
+                credits.add(
+                    (
+                        UUID(str(row['film_id'])),
+                        full_name_field.clean(row['full_name'].strip(), None),
+                        role_field.clean(row['role'], None),
+                    ),
+                )
+            except (KeyError, ValueError, AttributeError, ValidationError):
+                self.counts['skipped:credits'] += 1
+
+        with self._stage('persons'):
+            person_ids = self._resolve_persons({full_name for _, full_name, _ in credits})
+        with self._stage('film_persons'):
+            filmwork_ids = {filmwork_id for filmwork_id, _, _ in credits}
+            known = set(Filmwork.objects.filter(id__in=filmwork_ids).values_list('id', flat=True))
+            existing = set(
+                PersonFilmwork.objects.filter(film_work_id__in=known).values_list(
+                    'film_work_id', 'person_id', 'role'
+                )
+            )
+            links = []
+            for filmwork_id, full_name, role in credits:
+                key = (filmwork_id, person_ids[full_name], role)
+                if filmwork_id not in known:
+                    self.counts['skipped:credits'] += 1
+                elif key not in existing:
+                    existing.add(key)
+                    links.append(
+                        PersonFilmwork(film_work_id=filmwork_id, person_id=key[1], role=role),
+                    )
+            PersonFilmwork.objects.bulk_create(links)
+            self.counts['film_persons'] += len(links)
+
+    def _resolve_genres(self, names: set[str]) -> dict[str, UUID]:
+        """Id жанров по названиям. Справочник жанров мал и кешируется целиком"""
+        missing = names - self._genres.keys()
+        if missing:
+            Genre.objects.bulk_create(
+                [Genre(name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            self._genres.update(Genre.objects.filter(name__in=missing).values_list('name', 'id'))
+            self.counts['genres'] += len(missing)
+        return self._genres
+
+    def _resolve_persons(self, full_names: set[str]) -> dict[str, UUID]:
+        """Id персон пачки по именам: один запрос и вставка только недостающих"""
+        person_ids: dict[str, UUID] = {}
+        # Из однофамильцев берётся персона с наименьшим id
+        for full_name, person_id in (
+            Person.objects.filter(full_name__in=full_names)
+            .order_by('-id')
+            .values_list('full_name', 'id')
+        ):
+            person_ids[full_name] = person_id
+        created = [Person(full_name=full_name) for full_name in full_names - person_ids.keys()]
+        Person.objects.bulk_create(created)
+        person_ids.update((person.full_name, person.id) for person in created)
+        self.counts['persons'] += len(full_names)
+        return person_ids
+
+    def _filmwork(self, row: dict[str, Any]) -> tuple[Filmwork, frozenset[str]] | None:
+        """
+        Фильм из строки фида и поля, заданные в строке, или None, если строка
+        не проходит проверку полей модели. Пустые значения считаются незаданными
+        """
+        fields = frozenset(
+            name for name in Filmwork.document_fields if row.get(name) not in (None, '')
+        )
+        try:
+            filmwork = Filmwork(id=UUID(str(row['id'])))
+            for name in fields | {'title'}:
+                value = row['title'].strip() if name == 'title' else row[name]
+                field = Filmwork._meta.get_field(name)
+                setattr(filmwork, field.attname, field.clean(value, filmwork))
+        except (KeyError, ValueError, AttributeError, ValidationError):
+            return None
+        return filmwork, fields | {'title'}
+
+    def _names(self, value: Any) -> list[str]:
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = value.split(CSV_LIST_SEPARATOR)
+        return sorted({name.strip() for name in value if name.strip()})
@@ -0,0 +1,44 @@
+import json
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.benchmarks.catalog import SyntheticCatalog
+from movies.benchmarks.suite import BenchmarkSuite
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает бенчмарки синхронизации и админки на синтетическом каталоге '
+        'с заглушками Elasticsearch и MongoDB и выводит результаты в JSON. '
+        'Каталог загружается в отдельную временную базу на сервере PostgreSQL из настроек'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--films', type=int, default=1000)
+        parser.add_argument('--persons', type=int, default=4000)
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--persons-per-film', type=int, default=6)
+        parser.add_argument('--genres-per-film', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=settings.SYNC_BATCH_SIZE)
+        parser.add_argument('--output', help='Файл для результатов, по умолчанию stdout')
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        catalog = SyntheticCatalog(
+            films=kwargs['films'],
+            persons=kwargs['persons'],
+            genres=kwargs['genres'],
+            persons_per_film=kwargs['persons_per_film'],
+            genres_per_film=kwargs['genres_per_film'],
+            seed=kwargs['seed'],
+        )
+        suite = BenchmarkSuite(catalog, kwargs['repeat'], kwargs['batch_size'])
+        report = json.dumps(suite.run(), indent=2, ensure_ascii=False)
+        if kwargs['output']:
+            with open(kwargs['output'], 'w', encoding='utf-8') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
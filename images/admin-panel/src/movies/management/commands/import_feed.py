@@ -0,0 +1,38 @@
+import time
+from contextlib import ExitStack
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from config import settings
+from movies.importers import FeedImporter, iter_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует фиды фильмов и участия персон (CSV или JSON Lines) в PostgreSQL, ES и MongoDB'
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--films', help='Фид фильмов')
+        parser.add_argument('--credits', help='Фид участия персон в фильмах')
+        parser.add_argument('--batch-size', type=int, default=settings.SYNC_BATCH_SIZE)
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        if not kwargs['films'] and not kwargs['credits']:
+            raise CommandError('Укажите --films и/или --credits')
+        started = time.monotonic()
+        importer = FeedImporter(kwargs['batch_size'])
+        with ExitStack() as stack:
+            feeds = {}
+            for name in ('films', 'credits'):
+                if kwargs[name]:
+                    stream = stack.enter_context(open(kwargs[name], encoding='utf-8', newline=''))
+                    feeds[name] = iter_feed(stream, kwargs[name])
+            importer.run(**feeds)
+        for stage, (rows, seconds, rate) in importer.rates().items():
+            self.stdout.write(f'{stage}: {rows} строк, {seconds:.1f} с, {rate:.0f} строк/с')
+        for name, count in sorted(importer.counts.items()):
+            if name not in importer.seconds:
+                self.stdout.write(f'{name}: {count}')
+        self.stdout.write(f'Импорт занял {time.monotonic() - started:.1f} с')
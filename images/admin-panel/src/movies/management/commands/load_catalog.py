@@ -0,0 +1,24 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.importers import CatalogLoader, iter_json_array
+
+
+class Command(BaseCommand):
+    help = 'Потоково загружает фикстуру каталога и один раз синхронизирует ES и MongoDB'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=settings.SYNC_BATCH_SIZE)
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        started = time.monotonic()
+        loader = CatalogLoader(kwargs['batch_size'])
+        with open(kwargs['path'], encoding='utf-8') as fixture:
+            loader.load(iter_json_array(fixture))
+        for name, count in sorted(loader.counts.items()):
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(f'Загрузка заняла {time.monotonic() - started:.1f} с')
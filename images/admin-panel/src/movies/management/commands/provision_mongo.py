@@ -0,0 +1,27 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils.dateparse import parse_datetime
+
+from config import settings
+from movies.sync import provision_filmworks
+
+
+class Command(BaseCommand):
+    help = 'Создаёт в MongoDB недостающие документы фильмов из PostgreSQL'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=settings.SYNC_CHUNK_SIZE)
+        parser.add_argument(
+            '--since',
+            type=parse_datetime,
+            help='Проверять только фильмы, изменённые после указанного момента (ISO 8601)',
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        started = time.monotonic()
+        provisioned = provision_filmworks(kwargs['since'], kwargs['batch_size'])
+        self.stdout.write(
+            f'Создано документов: {provisioned}, {time.monotonic() - started:.1f} с',
+        )
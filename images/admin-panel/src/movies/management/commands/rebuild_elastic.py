@@ -0,0 +1,58 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.elastic import ElasticsearchStartUpService
+
+
+class Command(BaseCommand):
+    help = 'Строит новые версии индексов и без простоя переключает на них алиасы'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--index',
+            nargs='+',
+            choices=tuple(settings.ELASTICSEARCH_INDICES),
+            default=list(settings.ELASTICSEARCH_INDICES),
+        )
+        parser.add_argument(
+            '--outdated',
+            action='store_true',
+            help='Перестраивать только индексы с устаревшей схемой',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ELASTICSEARCH_BULK_CHUNK_SIZE * settings.ELASTICSEARCH_BULK_THREADS,
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.ELASTICSEARCH_BULK_CHUNK_SIZE
+        )
+        parser.add_argument('--threads', type=int, default=settings.ELASTICSEARCH_BULK_THREADS)
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=1,
+            help='Сколько предыдущих версий оставить для отката',
+        )
+        parser.add_argument(
+            '--forcemerge',
+            action='store_true',
+            help='Слить сегменты новой версии в один перед переключением алиаса',
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        elastic = ElasticsearchStartUpService()
+        for index in kwargs['index']:
+            if kwargs['outdated'] and not elastic.is_outdated(index):
+                continue
+            new_index = elastic.rebuild_index(
+                index,
+                batch_size=kwargs['batch_size'],
+                chunk_size=kwargs['chunk_size'],
+                thread_count=kwargs['threads'],
+                keep=kwargs['keep'],
+                forcemerge=kwargs['forcemerge'],
+            )
+            self.stdout.write(f'{index} -> {new_index}')
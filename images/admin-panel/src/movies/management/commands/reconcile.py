@@ -0,0 +1,39 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.reconcile import Reconciler, targets
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Elasticsearch и MongoDB с PostgreSQL и исправляет расхождения'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--target',
+            nargs='+',
+            choices=('movies', 'persons', 'genres', 'mongo'),
+            default=['movies', 'persons', 'genres', 'mongo'],
+        )
+        parser.add_argument('--leaf-size', type=int, default=settings.RECONCILE_LEAF_SIZE)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только найти расхождения, не исправляя их',
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        available = targets()
+        for name in kwargs['target']:
+            started = time.monotonic()
+            reconciler = Reconciler(available[name], kwargs['leaf_size'], not kwargs['dry_run'])
+            counts = reconciler.run()
+            self.stdout.write(
+                f'{name}: корзин {counts["buckets"]}, не совпало {counts["mismatched"]}, '
+                f'отсутствует {counts["missing"]}, лишних {counts["orphaned"]}, '
+                f'устаревших {counts["stale"]}, создано {counts["created"]}, '
+                f'обновлено {counts["refreshed"]}, удалено {counts["deleted"]}, '
+                f'{time.monotonic() - started:.1f} с',
+            )
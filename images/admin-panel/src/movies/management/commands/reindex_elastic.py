@@ -0,0 +1,82 @@
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.elastic import ElasticsearchStartUpService, elastic_service
+
+PROGRESS_EVERY = 5000
+
+
+class Command(BaseCommand):
+    help = 'Полностью переиндексирует фильмы, персоны и жанры через bulk API'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--index',
+            nargs='+',
+            choices=('movies', 'persons', 'genres'),
+            default=['genres', 'persons', 'movies'],
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ELASTICSEARCH_BULK_CHUNK_SIZE * settings.ELASTICSEARCH_BULK_THREADS,
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.ELASTICSEARCH_BULK_CHUNK_SIZE
+        )
+        parser.add_argument('--threads', type=int, default=settings.ELASTICSEARCH_BULK_THREADS)
+        parser.add_argument(
+            '--bulk-load',
+            action='store_true',
+            help='Отключить реплики и refresh индекса на время загрузки',
+        )
+        parser.add_argument(
+            '--forcemerge',
+            action='store_true',
+            help='Слить сегменты после загрузки, вместе с --bulk-load',
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        startup = ElasticsearchStartUpService()
+        with elastic_service.bulk_mode():
+            for index in kwargs['index']:
+                with ExitStack() as stack:
+                    if kwargs['bulk_load']:
+                        stack.enter_context(startup.bulk_load(index, kwargs['forcemerge']))
+                    batches = elastic_service.iter_documents(index, kwargs['batch_size'])
+                    self._reindex(index, batches, kwargs['chunk_size'], kwargs['threads'])
+
+    def _reindex(
+        self,
+        index: str,
+        batches: Iterator[list[dict[str, Any]]],
+        chunk_size: int,
+        thread_count: int,
+    ) -> None:
+        started = time.monotonic()
+        indexed = failed = reported = 0
+        for documents in batches:
+            for ok, info in elastic_service.bulk_index(
+                index, documents, chunk_size, thread_count, record=True
+            ):
+                if ok:
+                    indexed += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'{index}: ошибка индексации {info}')
+            if indexed + failed - reported >= PROGRESS_EVERY:
+                reported = indexed + failed
+                self._report(index, indexed, failed, started)
+        self._report(index, indexed, failed, started)
+
+    def _report(self, index: str, indexed: int, failed: int, started: float) -> None:
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{index}: {indexed} документов, {failed} ошибок, '
+            f'{indexed / elapsed:.1f} док/с, {elapsed:.1f} с',
+        )
@@ -0,0 +1,50 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.sync import SyncError, sync_incremental
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Переносит в Elasticsearch объекты, изменённые после сохранённой отметки'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            '--index',
+            nargs='+',
+            choices=tuple(settings.ELASTICSEARCH_INDICES),
+            default=['genres', 'persons', 'movies'],
+        )
+        parser.add_argument('--overlap', type=float, default=settings.SYNC_WATERMARK_OVERLAP)
+        parser.add_argument('--batch-size', type=int, default=settings.SYNC_CHUNK_SIZE)
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Повторять синхронизацию каждые --interval секунд',
+        )
+        parser.add_argument('--interval', type=float, default=settings.SYNC_INCREMENTAL_INTERVAL)
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Отправлять документы, даже если они не изменились с последней отправки',
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        overlap = timedelta(seconds=kwargs['overlap'])
+        while True:
+            for index in kwargs['index']:
+                try:
+                    sent = sync_incremental(index, overlap, kwargs['batch_size'], kwargs['force'])
+                except SyncError as e:
+                    logger.error(f'Индекс {index} не синхронизирован: {e}')
+                    continue
+                self.stdout.write(f'{index}: отправлено документов {sent}')
+            if not kwargs['loop']:
+                return
+            time.sleep(kwargs['interval'])
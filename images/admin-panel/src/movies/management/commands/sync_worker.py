@@ -0,0 +1,31 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from config import settings
+from movies.sync import process_outbox
+
+
+class Command(BaseCommand):
+    help = 'Переносит изменения из очереди синхронизации в Elasticsearch и MongoDB'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--batch-size', type=int, default=settings.SYNC_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=settings.SYNC_POLL_INTERVAL)
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать накопившуюся очередь и завершиться',
+        )
+
+    def handle(self, *args: Any, **kwargs: Any) -> None:
+        while True:
+            # Ошибки отдельных изменений записываются в очередь, пачка не блокируется ими
+            processed = process_outbox(kwargs['batch_size'])
+            if processed:
+                self.stdout.write(f'Синхронизировано изменений: {processed}')
+                continue
+            if kwargs['once']:
+                return
+            time.sleep(kwargs['interval'])
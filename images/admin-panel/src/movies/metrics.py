@@ -0,0 +1,197 @@
+"""
+Метрики админ-панели в формате Prometheus.
+
+Время и ошибки запросов к Elasticsearch и MongoDB собираются на уровне
+драйверов: узла транспорта Elasticsearch и слушателя команд pymongo,
+поэтому учитывается каждый запрос, включая повторы. Размеры пачек и время
+обработчиков сигналов записываются сервисами.
+
+Значения хранит prometheus_client. Если задан `PROMETHEUS_MULTIPROC_DIR`,
+каждый процесс пишет их в файлы этого каталога, а `/metrics` суммирует
+файлы всех воркеров gunicorn, поэтому ответ не зависит от того, какой
+воркер принял запрос. Без каталога отдаются значения текущего процесса.
+"""
+
+import functools
+import os
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, ParamSpec, TypeVar
+
+from elastic_transport import Urllib3HttpNode
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+from config import settings
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Файлы значений создаются вместе с метриками, поэтому каталог нужен до их объявления
+if settings.PROMETHEUS_MULTIPROC_DIR is not None:
+    os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+registry = CollectorRegistry()
+
+call_seconds = Histogram(
+    'admin_panel_external_call_seconds',
+    'Время запросов к Elasticsearch и MongoDB',
+    ('service', 'operation'),
+    registry=registry,
+    buckets=LATENCY_BUCKETS,
+)
+call_errors = Counter(
+    'admin_panel_external_call_errors_total',
+    'Ошибки запросов к Elasticsearch и MongoDB',
+    ('service', 'operation'),
+    registry=registry,
+)
+batch_size = Histogram(
+    'admin_panel_external_batch_size',
+    'Число документов в пакетных запросах к Elasticsearch и MongoDB',
+    ('service', 'operation'),
+    registry=registry,
+    buckets=SIZE_BUCKETS,
+)
+receiver_seconds = Histogram(
+    'admin_panel_signal_receiver_seconds',
+    'Время обработчиков сигналов моделей',
+    ('receiver',),
+    registry=registry,
+    buckets=LATENCY_BUCKETS,
+)
+receiver_errors = Counter(
+    'admin_panel_signal_receiver_errors_total',
+    'Ошибки обработчиков сигналов моделей',
+    ('receiver',),
+    registry=registry,
+)
+sync_seconds = Histogram(
+    'admin_panel_sync_apply_seconds',
+    'Время применения пачки изменений к Elasticsearch и MongoDB',
+    registry=registry,
+    buckets=LATENCY_BUCKETS,
+)
+sync_batch_size = Histogram(
+    'admin_panel_sync_apply_batch_size',
+    'Число изменений в применяемой пачке',
+    registry=registry,
+    buckets=SIZE_BUCKETS,
+)
+sync_errors = Counter(
+    'admin_panel_sync_apply_errors_total',
+    'Пачки изменений, которые не удалось применить',
+    registry=registry,
+)
+sync_collapsed = Counter(
+    'admin_panel_sync_changes_collapsed_total',
+    'Изменения, поглощённые уже накопленными в транзакции',
+    registry=registry,
+)
+sync_dispatched = Counter(
+    'admin_panel_sync_changes_dispatched_total',
+    'Изменения, переданные на применение после схлопывания',
+    registry=registry,
+)
+sync_unchanged = Counter(
+    'admin_panel_sync_documents_unchanged_total',
+    'Документы, не отправленные в Elasticsearch, так как не изменились',
+    registry=registry,
+)
+sync_outbox_dead = Counter(
+    'admin_panel_sync_outbox_dead_total',
+    'Записи очереди синхронизации, перенесённые в мёртвые после всех попыток',
+    registry=registry,
+)
+
+
+def record_batch(service: str, operation: str, size: int) -> None:
+    """Записывает размер пакетного запроса."""
+    batch_size.labels(service=service, operation=operation).observe(size)
+
+
+def record_error(service: str, operation: str) -> None:
+    """Считает ошибку запроса или элемента пакетного запроса."""
+    call_errors.labels(service=service, operation=operation).inc()
+
+
+def render() -> bytes:
+    """Метрики в текстовом формате Prometheus, в режиме нескольких процессов — суммарные"""
+    if settings.PROMETHEUS_MULTIPROC_DIR is None:
+        return generate_latest(registry)
+    collected = CollectorRegistry()
+    multiprocess.MultiProcessCollector(  # type: ignore[no-untyped-call]
+        collected, settings.PROMETHEUS_MULTIPROC_DIR
+    )
+    return generate_latest(collected)
+
+
+@contextmanager
+def track(histogram: Histogram, errors: Counter, **labels: Any) -> Iterator[None]:
+    """Записывает время выполнения блока и считает завершившиеся исключением."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        (errors.labels(**labels) if labels else errors).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        (histogram.labels(**labels) if labels else histogram).observe(elapsed)
+
+
+def instrument_receiver(func: Callable[P, R]) -> Callable[P, R]:
+    """Записывает время и ошибки обработчика сигнала."""
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with track(receiver_seconds, receiver_errors, receiver=func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class InstrumentedHttpNode(Urllib3HttpNode):
+    """Узел транспорта Elasticsearch, записывающий время и ошибки каждого запроса."""
+
+    def perform_request(self, method: str, target: str, *args: Any, **kwargs: Any) -> Any:
+        operation = es_operation(method, target)
+        with track(call_seconds, call_errors, service='elasticsearch', operation=operation):
+            response = super().perform_request(method, target, *args, **kwargs)
+        # 404 — штатный ответ для проверок существования и удаления отсутствующих документов
+        if response.meta.status >= 400 and response.meta.status != 404:
+            record_error('elasticsearch', operation)
+        return response
+
+
+def es_operation(method: str, target: str) -> str:
+    """Имя операции Elasticsearch по методу и пути: `post_bulk`, `put_doc`, `head_index`."""
+    segments = [segment for segment in target.split('?', 1)[0].split('/') if segment]
+    endpoints = [segment for segment in segments if segment.startswith('_')]
+    endpoint = endpoints[-1][1:] if endpoints else 'index'
+    return f'{method.lower()}_{endpoint}'
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Слушатель команд pymongo: время, ошибки и размер пачек каждой команды."""
+
+    # Поле команды со списком документов или операций
+    BATCH_FIELDS = {'insert': 'documents', 'update': 'updates', 'delete': 'deletes'}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        field = self.BATCH_FIELDS.get(event.command_name)
+        if field is not None and field in event.command:
+            record_batch('mongo', event.command_name, len(event.command[field]))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        call_seconds.labels('mongo', event.command_name).observe(event.duration_micros / 1e6)
+        if event.reply.get('writeErrors'):
+            record_error('mongo', event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        call_seconds.labels('mongo', event.command_name).observe(event.duration_micros / 1e6)
+        record_error('mongo', event.command_name)
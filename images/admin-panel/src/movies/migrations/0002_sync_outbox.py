@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOutbox',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'entity',
+                    models.CharField(
+                        choices=[
+                            ('filmwork', 'Filmwork'),
+                            ('person', 'Person'),
+                            ('genre', 'Genre'),
+                        ],
+                        max_length=31,
+                    ),
+                ),
+                ('entity_id', models.UUIDField()),
+                (
+                    'operation',
+                    models.CharField(
+                        choices=[('create', 'Create'), ('index', 'Index'), ('delete', 'Delete')],
+                        max_length=31,
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'sync_outbox',
+            },
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+# updated_at меняется и при изменениях в обход ORM (QuerySet.update, SQL),
+# а изменение связей отмечает связанные фильмы одним запросом на оператор
+TOUCH_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER film_work_touch BEFORE UPDATE ON film_work
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE TRIGGER person_touch BEFORE UPDATE ON person
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE TRIGGER genre_touch BEFORE UPDATE ON genre
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE OR REPLACE FUNCTION touch_film_work() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE film_work SET updated_at = now()
+            WHERE id IN (SELECT film_work_id FROM old_rows);
+    ELSE
+        UPDATE film_work SET updated_at = now()
+            WHERE id IN (SELECT film_work_id FROM new_rows);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER person_film_work_insert_touch AFTER INSERT ON person_film_work
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_film_work();
+CREATE TRIGGER person_film_work_update_touch AFTER UPDATE ON person_film_work
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_film_work();
+CREATE TRIGGER person_film_work_delete_touch AFTER DELETE ON person_film_work
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_film_work();
+CREATE TRIGGER genre_film_work_insert_touch AFTER INSERT ON genre_film_work
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_film_work();
+CREATE TRIGGER genre_film_work_update_touch AFTER UPDATE ON genre_film_work
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_film_work();
+CREATE TRIGGER genre_film_work_delete_touch AFTER DELETE ON genre_film_work
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION touch_film_work();
+"""
+
+DROP_TOUCH_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS genre_film_work_insert_touch ON genre_film_work;
+DROP TRIGGER IF EXISTS genre_film_work_update_touch ON genre_film_work;
+DROP TRIGGER IF EXISTS genre_film_work_delete_touch ON genre_film_work;
+DROP TRIGGER IF EXISTS person_film_work_insert_touch ON person_film_work;
+DROP TRIGGER IF EXISTS person_film_work_update_touch ON person_film_work;
+DROP TRIGGER IF EXISTS person_film_work_delete_touch ON person_film_work;
+DROP FUNCTION IF EXISTS touch_film_work();
+DROP TRIGGER IF EXISTS genre_touch ON genre;
+DROP TRIGGER IF EXISTS person_touch ON person;
+DROP TRIGGER IF EXISTS film_work_touch ON film_work;
+DROP FUNCTION IF EXISTS touch_updated_at();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_sync_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncWatermark',
+            fields=[
+                ('index', models.CharField(max_length=31, primary_key=True, serialize=False)),
+                ('synced_until', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'sync_watermark',
+            },
+        ),
+        migrations.RunSQL(TOUCH_TRIGGERS_SQL, DROP_TOUCH_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# search_vector поддерживается триггерами, поэтому заполняется и при bulk_create,
+# и при изменениях в обход ORM. Конфигурация совпадает с movies.consts.SEARCH_CONFIG
+SEARCH_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION film_work_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector =
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION genre_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector =
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER film_work_search_vector BEFORE INSERT OR UPDATE OF title, description
+    ON film_work FOR EACH ROW EXECUTE FUNCTION film_work_search_vector();
+CREATE TRIGGER genre_search_vector BEFORE INSERT OR UPDATE OF name, description
+    ON genre FOR EACH ROW EXECUTE FUNCTION genre_search_vector();
+
+-- Заполнение существующих строк не должно сдвигать updated_at
+ALTER TABLE film_work DISABLE TRIGGER film_work_touch;
+ALTER TABLE genre DISABLE TRIGGER genre_touch;
+UPDATE film_work SET title = title;
+UPDATE genre SET name = name;
+ALTER TABLE film_work ENABLE TRIGGER film_work_touch;
+ALTER TABLE genre ENABLE TRIGGER genre_touch;
+"""
+
+DROP_SEARCH_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS genre_search_vector ON genre;
+DROP TRIGGER IF EXISTS film_work_search_vector ON film_work;
+DROP FUNCTION IF EXISTS genre_search_vector();
+DROP FUNCTION IF EXISTS film_work_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_sync_watermark'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='filmwork',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_TRIGGERS_SQL, DROP_SEARCH_TRIGGERS_SQL),
+        migrations.AddIndex(
+            model_name='filmwork',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='film_work_search_vector_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='filmwork',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title'], name='film_work_title_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='genre_search_vector_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'], name='genre_name_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['full_name'], name='person_full_name_trgm_idx', opclasses=['gin_trgm_ops']
+            ),
+        ),
+    ]
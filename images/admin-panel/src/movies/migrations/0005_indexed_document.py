@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedDocument',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('index', models.CharField(max_length=31)),
+                ('entity_id', models.UUIDField()),
+                ('fingerprint', models.CharField(max_length=40)),
+            ],
+            options={
+                'db_table': 'indexed_document',
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('index', 'entity_id'), name='indexed_document_index_entity_id_uniq'
+                    )
+                ],
+            },
+        ),
+    ]
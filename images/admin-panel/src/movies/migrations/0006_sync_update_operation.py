@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_indexed_document'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncoutbox',
+            name='operation',
+            field=models.CharField(
+                choices=[
+                    ('update', 'Update'),
+                    ('create', 'Create'),
+                    ('index', 'Index'),
+                    ('delete', 'Delete'),
+                ],
+                max_length=31,
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_sync_update_operation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncoutbox',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='syncoutbox',
+            name='dead_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='syncoutbox',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddIndex(
+            model_name='syncoutbox',
+            index=models.Index(
+                condition=models.Q(('dead_at__isnull', True)),
+                fields=['attempts', 'id'],
+                name='sync_outbox_pending_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_sync_outbox_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexeddocument',
+            name='indexed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
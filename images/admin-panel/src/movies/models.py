@@ -1,10 +1,21 @@
 import uuid
+from typing import Any
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from movies.consts import MAX_ENUM_STRING_LEN, MAX_STRING_LEN
-from movies.enums import FilmworkAccessType, FilmworkAgeRating, FilmworkType, PersonRole
+from movies.enums import (
+    FilmworkAccessType,
+    FilmworkAgeRating,
+    FilmworkType,
+    PersonRole,
+    SyncEntity,
+    SyncOperation,
+)
 
 
 class TimeStampedMixin(models.Model):
@@ -38,9 +49,15 @@ class Genre(UUIDMixin, TimeStampedMixin):
         unique=True,
     )
     description = models.TextField(blank=True)
+    # Заполняется триггером из name и description
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         db_table = 'genre'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='genre_search_vector_idx'),
+            GinIndex(fields=['name'], name='genre_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -87,13 +104,55 @@ class Filmwork(UUIDMixin, TimeStampedMixin):
         'Person',
         through='PersonFilmwork',
     )
+    # Заполняется триггером из title и description
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Поля, которые попадают в документ Elasticsearch без преобразования связей
+    document_fields = frozenset(
+        ('title', 'description', 'rating', 'release_date', 'type', 'age_rating'),
+    )
 
     class Meta:
         db_table = 'film_work'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='film_work_search_vector_idx'),
+            GinIndex(fields=['title'], name='film_work_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+    @classmethod
+    def from_db(cls, db: str | None, field_names: Any, values: Any) -> 'Filmwork':
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self) -> None:
+        """Запоминает текущие значения полей для поиска изменений."""
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def changed_fields(self) -> set[str] | None:
+        """
+        Поля, изменённые с загрузки из базы или прошлого сохранения.
+        None, если исходные значения неизвестны.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return {
+            field.name
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+            and (
+                field.attname not in loaded or loaded[field.attname] != self.__dict__[field.attname]
+            )
+        }
+
 
 class GenreFilmwork(UUIDMixin):
     """Промежуточная таблица привязки жанров и кинопроизведений."""
@@ -123,6 +182,13 @@ class Person(UUIDMixin, TimeStampedMixin):
 
     class Meta:
         db_table = 'person'
+        indexes = [
+            GinIndex(
+                fields=['full_name'],
+                name='person_full_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.full_name
@@ -153,3 +219,73 @@ class PersonFilmwork(UUIDMixin):
 
     def __str__(self) -> str:
         return f'{self.film_work.title} - {self.person.full_name} - {self.role}'
+
+
+class SyncOutbox(models.Model):
+    """Очередь изменений для фоновой синхронизации с Elasticsearch и MongoDB."""
+
+    entity = models.CharField(
+        max_length=MAX_ENUM_STRING_LEN,
+        choices=SyncEntity.choices,
+    )
+    entity_id = models.UUIDField()
+    operation = models.CharField(
+        max_length=MAX_ENUM_STRING_LEN,
+        choices=SyncOperation.choices,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Неудачные попытки применения и ошибка последней из них
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Время переноса в «мёртвые» записи, которые воркер больше не обрабатывает
+    dead_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'sync_outbox'
+        indexes = [
+            models.Index(
+                fields=['attempts', 'id'],
+                name='sync_outbox_pending_idx',
+                condition=models.Q(dead_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.operation} {self.entity} {self.entity_id}'
+
+
+class SyncWatermark(models.Model):
+    """Отметка, до которой изменения индекса перенесены инкрементальной синхронизацией."""
+
+    index = models.CharField(
+        max_length=MAX_ENUM_STRING_LEN,
+        primary_key=True,
+    )
+    synced_until = models.DateTimeField()
+
+    class Meta:
+        db_table = 'sync_watermark'
+
+    def __str__(self) -> str:
+        return f'{self.index}: {self.synced_until}'
+
+
+class IndexedDocument(models.Model):
+    """Отпечаток документа, последним отправленного в индекс Elasticsearch."""
+
+    index = models.CharField(max_length=MAX_ENUM_STRING_LEN)
+    entity_id = models.UUIDField()
+    fingerprint = models.CharField(max_length=40)
+    indexed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'indexed_document'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['index', 'entity_id'],
+                name='indexed_document_index_entity_id_uniq',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.index} {self.entity_id}: {self.fingerprint}'
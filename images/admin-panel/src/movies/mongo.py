@@ -1,21 +1,24 @@
+import asyncio
+from collections.abc import Collection
+from typing import Any
 from uuid import UUID
 
 from bson.binary import Binary
-from pymongo import MongoClient
-from pymongo.errors import CollectionInvalid
+from pymongo import AsyncMongoClient, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid
 
 from config import settings
+from movies.clients import get_async_mongo, get_mongo
+
+# Код ошибки MongoDB при нарушении уникальности ключа
+DUPLICATE_KEY_ERROR = 11000
 
 
 class MongoDBStartUpService:
-    def __init__(self) -> None:
-        self.mongo = MongoClient(
-            host=settings.MONGO_HOST,
-            port=settings.MONGO_PORT,
-            username=settings.MONGO_USERNAME,
-            password=settings.MONGO_PASSWORD,
-            uuidRepresentation=settings.MONGO_UUID_REPRESENTATION,
-        )
+    @property
+    def mongo(self) -> MongoClient[Any]:
+        mongo: MongoClient[Any] = get_mongo()
+        return mongo
 
     def start(self) -> None:
         self._create_users_collection()
@@ -61,14 +64,10 @@ class MongoDBStartUpService:
 
 
 class MongoDBService:
-    def __init__(self) -> None:
-        self.mongo = MongoClient(
-            host=settings.MONGO_HOST,
-            port=settings.MONGO_PORT,
-            username=settings.MONGO_USERNAME,
-            password=settings.MONGO_PASSWORD,
-            uuidRepresentation=settings.MONGO_UUID_REPRESENTATION,
-        )
+    @property
+    def mongo(self) -> MongoClient[Any]:
+        mongo: MongoClient[Any] = get_mongo()
+        return mongo
 
     def create_filmwork_by_id(self, filmwork_id: UUID) -> None:
         filmwork_document = {
@@ -79,6 +78,58 @@ class MongoDBService:
         }
         self.mongo['ugc_database']['filmworks'].insert_one(filmwork_document)
 
+    def create_filmworks(self, filmwork_ids: Collection[UUID]) -> None:
+        """Идемпотентно создаёт документы фильмов одним bulk-запросом."""
+        if not filmwork_ids:
+            return
+        operations = [
+            UpdateOne(
+                {'_id': self.to_binary(filmwork_id)},
+                {'$setOnInsert': {'rating': {'votes': []}}},
+                upsert=True,
+            )
+            for filmwork_id in filmwork_ids
+        ]
+        self.mongo['ugc_database']['filmworks'].bulk_write(operations, ordered=False)
+
+    def missing_filmwork_ids(self, filmwork_ids: Collection[UUID]) -> list[UUID]:
+        """Возвращает id фильмов, для которых ещё нет документа в MongoDB."""
+        if not filmwork_ids:
+            return []
+        existing = {
+            document['_id']
+            for document in self.mongo['ugc_database']['filmworks'].find(
+                {'_id': {'$in': [self.to_binary(filmwork_id) for filmwork_id in filmwork_ids]}},
+                {'_id': 1},
+            )
+        }
+        return [
+            filmwork_id
+            for filmwork_id in filmwork_ids
+            if self.to_binary(filmwork_id) not in existing
+        ]
+
+    def provision_filmworks(self, filmwork_ids: Collection[UUID]) -> int:
+        """
+        Создаёт недостающие документы фильмов одним неупорядоченным `insert_many`.
+        Документы, созданные параллельно между проверкой и вставкой, пропускаются.
+        Возвращает число созданных документов.
+        """
+        missing = self.missing_filmwork_ids(filmwork_ids)
+        if not missing:
+            return 0
+        documents = [
+            {'_id': self.to_binary(filmwork_id), 'rating': {'votes': []}} for filmwork_id in missing
+        ]
+        try:
+            self.mongo['ugc_database']['filmworks'].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error['code'] != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            return int(e.details.get('nInserted', 0))
+        return len(documents)
+
     def delete_filmwork_cascade_by_id(self, filmwork_id: UUID) -> bool:
         """Удаляет фильм и все связанные с ним данные."""
         try:
@@ -101,6 +152,70 @@ class MongoDBService:
         except Exception as e:
             return False
 
+    def delete_filmworks_cascade(self, filmwork_ids: Collection[UUID]) -> int:
+        """
+        Удаляет фильмы и все связанные с ними данные запросами с `$in`:
+        по одному запросу на коллекцию независимо от числа фильмов.
+        Возвращает число удалённых документов фильмов.
+        """
+        if not filmwork_ids:
+            return 0
+        binary_ids = [self.to_binary(filmwork_id) for filmwork_id in filmwork_ids]
+        db = self.mongo['ugc_database']
+
+        filmwork_result = db['filmworks'].delete_many({'_id': {'$in': binary_ids}})
+
+        db['reviews'].delete_many({'filmwork_id': {'$in': binary_ids}})
+
+        db['users'].update_many(
+            {'bookmarks.filmwork_id': {'$in': binary_ids}},
+            {'$pull': {'bookmarks': {'filmwork_id': {'$in': binary_ids}}}},
+        )
+        return int(filmwork_result.deleted_count)
+
     def to_binary(self, value: UUID) -> Binary:
         """Convert `UUID` to MongoDB binary format."""
         return Binary(value.bytes)
+
+
+class AsyncMongoDBService:
+    """Операции синхронизации фильмов на асинхронном клиенте MongoDB."""
+
+    @property
+    def mongo(self) -> AsyncMongoClient[Any]:
+        mongo: AsyncMongoClient[Any] = get_async_mongo()
+        return mongo
+
+    async def create_filmworks(self, filmwork_ids: Collection[UUID]) -> None:
+        """Идемпотентно создаёт документы фильмов одним bulk-запросом."""
+        if not filmwork_ids:
+            return
+        operations = [
+            UpdateOne(
+                {'_id': Binary(filmwork_id.bytes)},
+                {'$setOnInsert': {'rating': {'votes': []}}},
+                upsert=True,
+            )
+            for filmwork_id in filmwork_ids
+        ]
+        await self.mongo['ugc_database']['filmworks'].bulk_write(operations, ordered=False)
+
+    async def delete_filmworks_cascade(self, filmwork_ids: Collection[UUID]) -> int:
+        """
+        Удаляет фильмы и все связанные с ними данные. Коллекции независимы,
+        поэтому запросы к ним выполняются одновременно.
+        Возвращает число удалённых документов фильмов.
+        """
+        if not filmwork_ids:
+            return 0
+        binary_ids = [Binary(filmwork_id.bytes) for filmwork_id in filmwork_ids]
+        db = self.mongo['ugc_database']
+        filmwork_result, *_ = await asyncio.gather(
+            db['filmworks'].delete_many({'_id': {'$in': binary_ids}}),
+            db['reviews'].delete_many({'filmwork_id': {'$in': binary_ids}}),
+            db['users'].update_many(
+                {'bookmarks.filmwork_id': {'$in': binary_ids}},
+                {'$pull': {'bookmarks': {'filmwork_id': {'$in': binary_ids}}}},
+            ),
+        )
+        return int(filmwork_result.deleted_count)
@@ -0,0 +1,219 @@
+"""
+Постраничный вывод больших списков админки.
+
+Число строк берётся из оценок планировщика PostgreSQL, а страницы
+при сортировке по первичному ключу выбираются по ключу (keyset pagination),
+поэтому стоимость страницы не зависит от размера таблицы и её номера.
+"""
+
+import copy
+from collections.abc import Iterator
+from typing import Any
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Model, QuerySet
+from django.http import HttpRequest
+from django.utils.functional import cached_property
+
+from config import settings
+
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+
+def estimate_count(queryset: QuerySet[Model]) -> int | None:
+    """
+    Оценка числа строк queryset по статистике PostgreSQL: `pg_class.reltuples`
+    для всей таблицы, оценка плана `EXPLAIN` для выборки с условиями.
+    Возвращает None, если оценки нет.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.order_by().query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # До первого ANALYZE reltuples равен -1
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):  # type: ignore[type-arg]
+    """
+    Paginator, использующий оценку числа строк для больших выборок.
+    Оценка может быть выше реального числа строк, поэтому номер страницы
+    проверяется по её строкам, ссылки на последние страницы по оценке
+    не выводятся, а пустая страница заменяется последней по точному подсчёту.
+    """
+
+    # Номер последней страницы, на которую заменена запрошенная пустая
+    clamped: int | None = None
+    # Номер страницы, оказавшейся неполной, то есть последней
+    last_seen: int | None = None
+
+    @cached_property
+    def counted(self) -> tuple[int, bool]:
+        """Число строк и признак того, что это оценка"""
+        if not isinstance(self.object_list, QuerySet):
+            return super().count, False
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count, False
+        return estimate, True
+
+    @property
+    def count(self) -> int:
+        return self.counted[0]
+
+    @property
+    def estimated(self) -> bool:
+        return self.counted[1]
+
+    def validate_number(self, number: Any) -> int:
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Страницы за пределами оценки могут существовать, их проверяет `page`
+            if not self.estimated or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number: Any) -> Page:  # type: ignore[type-arg]
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        rows = self.object_list[bottom:top]
+        if len(rows) < self.per_page:
+            self.last_seen = number
+        if rows or number == 1:
+            return Page(rows, number, self)
+        # Оценка завышена: число строк считается точно, выводится последняя страница
+        self.__dict__['counted'] = (super().count, False)
+        self.__dict__.pop('num_pages', None)
+        self.clamped = self.num_pages
+        return super().page(self.clamped)
+
+    def get_elided_page_range(
+        self,
+        number: Any = 1,
+        *,
+        on_each_side: int = 3,
+        on_ends: int = 2,
+    ) -> Iterator[str | int]:
+        if not self.estimated:
+            yield from super().get_elided_page_range(
+                number, on_each_side=on_each_side, on_ends=on_ends
+            )
+            return
+        number = self.validate_number(number)
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield str(self.ELLIPSIS)
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if self.last_seen != number:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield str(self.ELLIPSIS)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Список объектов с переходом по страницам по первичному ключу:
+    следующая страница выбирается условием `pk < последний` вместо OFFSET.
+    Используется, когда список отсортирован только по первичному ключу,
+    иначе работает обычная постраничная навигация.
+    """
+
+    def __init__(self, request: HttpRequest, *args: Any, **kwargs: Any) -> None:
+        self.after = request.GET.get(AFTER_VAR)
+        self.before = request.GET.get(BEFORE_VAR)
+        if self.after is not None or self.before is not None:
+            # Курсор не является фильтром и не должен попадать в ссылки списка
+            request = copy.copy(request)
+            query = request.GET.copy()
+            query.pop(AFTER_VAR, None)
+            query.pop(BEFORE_VAR, None)
+            request.GET = query  # type: ignore[assignment]
+        self.keyset = False
+        self.first_url = self.previous_url = self.next_url = ''
+        super().__init__(request, *args, **kwargs)
+
+    def get_results(self, request: HttpRequest) -> None:
+        descending = self._keyset_descending()
+        if descending is None:
+            super().get_results(request)
+            clamped = getattr(self.paginator, 'clamped', None)
+            if clamped is not None:
+                self.page_num = clamped
+                self.result_count = self.paginator.count
+                self.multi_page = self.result_count > self.list_per_page
+            return
+        self.keyset = True
+        self.paginator = self.model_admin.get_paginator(
+            request,
+            self.queryset,
+            self.list_per_page,
+        )
+        self.result_count = self.paginator.count
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.result_count > self.list_per_page
+
+        queryset = self.queryset
+        forward = self.before is None
+        cursor = self._cursor(self.after if forward else self.before)
+        if cursor is not None:
+            lookup = 'pk__lt' if descending == forward else 'pk__gt'
+            queryset = queryset.filter(**{lookup: cursor})
+        if not forward:
+            queryset = queryset.reverse()
+        rows = list(queryset[: self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[: self.list_per_page]
+        if not forward:
+            rows.reverse()
+        self.result_list = rows
+
+        if rows and (has_more if forward else cursor is not None):
+            self.next_url = self.get_query_string({AFTER_VAR: rows[-1].pk}, [PAGE_VAR])
+        if rows and (cursor is not None if forward else has_more):
+            self.previous_url = self.get_query_string({BEFORE_VAR: rows[0].pk}, [PAGE_VAR])
+            self.first_url = self.get_query_string(remove=[PAGE_VAR])
+
+    def _keyset_descending(self) -> bool | None:
+        """Направление сортировки по первичному ключу или None, если сортировка другая."""
+        if self.list_editable or self.show_all:
+            return None
+        ordering = self.queryset.query.order_by
+        if len(ordering) != 1:
+            return None
+        field = ordering[0]
+        pk = self.lookup_opts.pk
+        if field.lstrip('-') not in ('pk', pk.name, pk.attname):
+            return None
+        return bool(field.startswith('-'))
+
+    def _cursor(self, value: str | None) -> Any:
+        if value is None:
+            return None
+        try:
+            return self.lookup_opts.pk.to_python(value)
+        except ValidationError as e:
+            raise IncorrectLookupParameters(e)
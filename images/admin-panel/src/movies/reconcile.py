@@ -0,0 +1,332 @@
+"""
+Сверка PostgreSQL с индексами Elasticsearch и коллекцией фильмов MongoDB.
+
+Идентификаторы делятся на корзины по шестнадцатеричному префиксу id. Для каждой
+корзины хранилища возвращают число записей и контрольную сумму, вычисленные
+на своей стороне, поэтому при совпадении корзины данные не читаются. Только
+несовпавшие корзины делятся дальше, пока не станут меньше `leaf_size`, после чего
+id и отпечатки корзины читаются целиком и сравниваются. Память ограничена размером листа.
+
+В сумму индексов Elasticsearch входит и отпечаток документа. Со стороны PostgreSQL
+берётся отпечаток из `IndexedDocument`, если объект не изменялся после отправки,
+поэтому устаревшие документы отличаются от актуальных и отправляются заново.
+"""
+
+import logging
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any, Protocol
+from uuid import UUID
+
+from elasticsearch.helpers import scan
+
+from django.db.models import CharField, Count, IntegerField, Model, OuterRef, Subquery, Sum, Value
+from django.db.models.expressions import Combinable, RawSQL
+from django.db.models.functions import Cast, Coalesce, Left
+
+from config import settings
+from movies.elastic import elastic_service
+from movies.models import Filmwork, Genre, IndexedDocument, Person
+from movies.mongo import MongoDBService
+from movies.sync import send_documents
+from movies.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+HEX_DIGITS = '0123456789abcdef'
+
+# Контрольная сумма корзины — сумма последних 7 шестнадцатеричных цифр id и первых
+# 7 цифр отпечатка документа. Слагаемые меньше 2^29, поэтому сумма точна в double
+# агрегаций Elasticsearch, пока в корзине меньше 2^24 документов
+CHECKSUM_DIGITS = 7
+CHECKSUM_SQL = f"('x' || lpad(right(id::text, {CHECKSUM_DIGITS}), 8, '0'))::bit(32)::int"
+FINGERPRINT_CHECKSUM_SQL = (
+    f"('x' || lpad(left(fingerprint, {CHECKSUM_DIGITS}), 8, '0'))::bit(32)::int"
+)
+CHECKSUM_SCRIPT = f"""
+long checksum = Long.parseLong(doc['id'].value.substring({36 - CHECKSUM_DIGITS}), 16);
+if (doc['fingerprint'].size() > 0) {{
+    checksum += Long.parseLong(doc['fingerprint'].value.substring(0, {CHECKSUM_DIGITS}), 16);
+}}
+emit(checksum);
+"""
+
+# Число записей и контрольная сумма корзины
+Bucket = tuple[int, int]
+
+
+class BucketSource(Protocol):
+    """Хранилище, умеющее считать корзины и отдавать id и отпечатки корзины."""
+
+    def buckets(self, prefix: str) -> dict[str, Bucket]:
+        """Корзины следующего уровня внутри префикса"""
+
+    def fingerprints(self, prefix: str) -> dict[UUID, str | None]:
+        """Все id с префиксом и отпечатки их документов"""
+
+
+def id_checksum(entity_id: UUID) -> int:
+    """Слагаемое контрольной суммы корзины по id записи"""
+    return int(str(entity_id)[-CHECKSUM_DIGITS:], 16)
+
+
+def id_bounds(prefix: str) -> tuple[UUID, UUID | None]:
+    """Границы диапазона id с префиксом: нижняя включительно, верхняя исключительно"""
+    low = UUID(prefix.ljust(32, '0'))
+    if not prefix or prefix == 'f' * len(prefix):
+        return low, None
+    high = f'{int(prefix, 16) + 1:0{len(prefix)}x}'
+    return low, UUID(high.ljust(32, '0'))
+
+
+class PostgresSource:
+    """
+    Корзины таблицы PostgreSQL: одна группировка на уровень. С `index` в сумму входит
+    отпечаток документа из `IndexedDocument`, отправленного не раньше последнего
+    изменения объекта; изменённые после отправки объекты считаются без отпечатка.
+    """
+
+    def __init__(self, model: type[Model], index: str | None = None) -> None:
+        self.model = model
+        self.index = index
+
+    def buckets(self, prefix: str) -> dict[str, Bucket]:
+        summand: Combinable = RawSQL(CHECKSUM_SQL, (), output_field=IntegerField())
+        if self.index is not None:
+            part = self._indexed().values(part=RawSQL(FINGERPRINT_CHECKSUM_SQL, ()))
+            summand += Coalesce(Subquery(part, output_field=IntegerField()), Value(0))
+        rows = (
+            self._range(prefix)
+            .annotate(bucket=Left(Cast('id', CharField()), len(prefix) + 1))
+            .values('bucket')
+            .annotate(count=Count('id'), checksum=Sum(summand, output_field=IntegerField()))
+            .order_by()
+        )
+        return {row['bucket']: (row['count'], row['checksum']) for row in rows}
+
+    def fingerprints(self, prefix: str) -> dict[UUID, str | None]:
+        if self.index is None:
+            return dict.fromkeys(self._range(prefix).values_list('id', flat=True).iterator())
+        rows = self._range(prefix).values_list(
+            'id', Subquery(self._indexed().values('fingerprint'))
+        )
+        return dict(rows.iterator())
+
+    def _indexed(self) -> Any:
+        """Отпечаток документа объекта, если объект не изменялся после его отправки"""
+        return IndexedDocument.objects.filter(
+            index=self.index,
+            entity_id=OuterRef('id'),
+            indexed_at__gte=OuterRef('updated_at'),
+        )
+
+    def _range(self, prefix: str) -> Any:
+        low, high = id_bounds(prefix)
+        queryset = self.model._default_manager.filter(id__gte=low)
+        return queryset if high is None else queryset.filter(id__lt=high)
+
+
+class ElasticsearchSource:
+    """Корзины индекса: одна агрегация по вычисляемым полям на уровень."""
+
+    def __init__(self, index: str) -> None:
+        self.index = index
+
+    def buckets(self, prefix: str) -> dict[str, Bucket]:
+        depth = len(prefix) + 1
+        response = elastic_service.client.search(
+            index=self.index,
+            size=0,
+            query=self._query(prefix),
+            runtime_mappings={
+                'bucket': {
+                    'type': 'keyword',
+                    'script': f"emit(doc['id'].value.substring(0, {depth}))",
+                },
+                'checksum': {'type': 'long', 'script': CHECKSUM_SCRIPT},
+            },
+            aggs={
+                'buckets': {
+                    'terms': {'field': 'bucket', 'size': len(HEX_DIGITS)},
+                    'aggs': {'checksum': {'sum': {'field': 'checksum'}}},
+                },
+            },
+        )
+        return {
+            bucket['key']: (bucket['doc_count'], int(bucket['checksum']['value']))
+            for bucket in response['aggregations']['buckets']['buckets']
+        }
+
+    def fingerprints(self, prefix: str) -> dict[UUID, str | None]:
+        hits = scan(
+            elastic_service.client,
+            index=self.index,
+            query={'query': self._query(prefix)},
+            _source=['fingerprint'],
+        )
+        return {UUID(hit['_id']): hit.get('_source', {}).get('fingerprint') for hit in hits}
+
+    def _query(self, prefix: str) -> dict[str, Any]:
+        return {'prefix': {'id': prefix}} if prefix else {'match_all': {}}
+
+
+class MongoSource:
+    """
+    Корзины коллекции фильмов. Id хранятся как binData, из которого агрегации
+    не извлекают цифры, поэтому контрольная сумма считается на клиенте: `_id`
+    диапазона читаются потоком по индексу без документов и сразу суммируются.
+    Документы MongoDB не повторяют данные фильма, поэтому отпечатков у них нет.
+    """
+
+    def __init__(self) -> None:
+        self.service = MongoDBService()
+
+    @property
+    def collection(self) -> Any:
+        return self.service.mongo['ugc_database']['filmworks']
+
+    def buckets(self, prefix: str) -> dict[str, Bucket]:
+        counts: Counter[str] = Counter()
+        checksums: Counter[str] = Counter()
+        for entity_id in self._ids(prefix):
+            bucket = str(entity_id)[: len(prefix) + 1]
+            counts[bucket] += 1
+            checksums[bucket] += id_checksum(entity_id)
+        return {bucket: (count, checksums[bucket]) for bucket, count in counts.items()}
+
+    def fingerprints(self, prefix: str) -> dict[UUID, str | None]:
+        return dict.fromkeys(self._ids(prefix))
+
+    def _ids(self, prefix: str) -> Iterator[UUID]:
+        documents = self.collection.find(self._range(prefix), {'_id': 1})
+        return (UUID(bytes=bytes(document['_id'])) for document in documents)
+
+    def _range(self, prefix: str) -> dict[str, Any]:
+        low, high = id_bounds(prefix)
+        condition = {'$gte': self.service.to_binary(low)}
+        if high is not None:
+            condition['$lt'] = self.service.to_binary(high)
+        return {'_id': condition}
+
+
+@dataclass
+class Target:
+    """Хранилище, сверяемое с таблицей PostgreSQL."""
+
+    name: str
+    model: type[Model]
+    source: BucketSource
+    # Индекс, отпечатки документов которого сверяются с `IndexedDocument`
+    index: str | None = None
+
+
+def targets() -> dict[str, Target]:
+    return {
+        'movies': Target('movies', Filmwork, ElasticsearchSource('movies'), 'movies'),
+        'persons': Target('persons', Person, ElasticsearchSource('persons'), 'persons'),
+        'genres': Target('genres', Genre, ElasticsearchSource('genres'), 'genres'),
+        'mongo': Target('mongo', Filmwork, MongoSource()),
+    }
+
+
+class Reconciler:
+    """
+    Сверяет хранилище с PostgreSQL и исправляет расхождения пачками:
+    отсутствующие записи создаются, устаревшие отправляются заново, лишние удаляются.
+    """
+
+    def __init__(
+        self,
+        target: Target,
+        leaf_size: int = settings.RECONCILE_LEAF_SIZE,
+        repair: bool = True,
+    ) -> None:
+        self.target = target
+        self.leaf_size = leaf_size
+        self.repair = repair
+        self.primary = PostgresSource(target.model, target.index)
+        self.counts: Counter[str] = Counter()
+
+    def run(self) -> Counter[str]:
+        for prefix, size in self._mismatched(''):
+            self._reconcile(prefix, size)
+        return self.counts
+
+    def _mismatched(self, prefix: str) -> Iterator[tuple[str, int]]:
+        """Несовпавшие корзины следующего уровня и наибольшее число записей в них"""
+        expected = self.primary.buckets(prefix)
+        actual = self.target.source.buckets(prefix)
+        for bucket in sorted(expected.keys() | actual.keys()):
+            self.counts['buckets'] += 1
+            expected_bucket = expected.get(bucket, (0, 0))
+            actual_bucket = actual.get(bucket, (0, 0))
+            if expected_bucket != actual_bucket:
+                self.counts['mismatched'] += 1
+                yield bucket, max(expected_bucket[0], actual_bucket[0])
+
+    def _reconcile(self, prefix: str, size: int) -> None:
+        # Дальше восьмой цифры в id идёт дефис, а корзины такого размера уже малы
+        if size > self.leaf_size and len(prefix) < 8:
+            for bucket, bucket_size in self._mismatched(prefix):
+                self._reconcile(bucket, bucket_size)
+            return
+        expected = self.primary.fingerprints(prefix)
+        actual = self.target.source.fingerprints(prefix)
+        self.counts['leaves'] += 1
+        missing = expected.keys() - actual.keys()
+        orphaned = actual.keys() - expected.keys()
+        stale = {
+            entity_id
+            for entity_id in expected.keys() & actual.keys()
+            if expected[entity_id] != actual[entity_id]
+        }
+        self.counts['missing'] += len(missing)
+        self.counts['orphaned'] += len(orphaned)
+        self.counts['stale'] += len(stale)
+        if missing or orphaned or stale:
+            logger.info(
+                f'{self.target.name}: корзина {prefix}, отсутствует {len(missing)}, '
+                f'лишних {len(orphaned)}, устаревших {len(stale)}',
+            )
+        if self.repair:
+            self._repair(missing, orphaned, stale)
+
+    def _repair(self, missing: set[UUID], orphaned: set[UUID], stale: set[UUID]) -> None:
+        for chunk in chunked(sorted(missing), settings.SYNC_CHUNK_SIZE):
+            self.counts['created'] += len(chunk) - len(self._create(chunk))
+        for chunk in chunked(sorted(stale), settings.SYNC_CHUNK_SIZE):
+            self.counts['refreshed'] += len(chunk) - len(self._create(chunk))
+        for chunk in chunked(sorted(orphaned), settings.SYNC_CHUNK_SIZE):
+            self._delete(chunk)
+            self.counts['deleted'] += len(chunk)
+
+    def _create(self, entity_ids: list[UUID]) -> list[object]:
+        """Создаёт отсутствующие или заново отправляет устаревшие записи. Возвращает ошибки"""
+        name = self.target.name
+        if name == 'mongo':
+            MongoDBService().provision_filmworks(entity_ids)
+            return []
+        if name == 'movies':
+            documents = elastic_service.build_filmwork_documents(entity_ids)
+        elif name == 'persons':
+            documents = [
+                elastic_service._person_to_document(person)
+                for person in Person.objects.filter(id__in=entity_ids)
+            ]
+        else:
+            documents = [
+                elastic_service._genre_to_document(genre)
+                for genre in Genre.objects.filter(id__in=entity_ids)
+            ]
+        errors: list[object] = send_documents(name, documents, force=True, thread_count=1)
+        return errors
+
+    def _delete(self, entity_ids: list[UUID]) -> None:
+        """Удаляет записи, которых нет в PostgreSQL"""
+        name = self.target.name
+        if name == 'mongo':
+            MongoDBService().delete_filmworks_cascade(entity_ids)
+            return
+        elastic_service.bulk_delete(name, entity_ids)
+        IndexedDocument.objects.filter(index=name, entity_id__in=entity_ids).delete()
@@ -1,115 +1,108 @@
+from collections.abc import Iterable
 from typing import Type
+from uuid import UUID
 
-from django.db.models.signals import post_delete, post_save, pre_delete
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from movies.elastic import elastic_service
+from movies.enums import SyncEntity, SyncOperation
 from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
-from movies.mongo import MongoDBService
+from movies.sync import Change, enqueue
 
+# Относительный импорт: mypy проверяет пакет как `src.movies` и без него не видит сигнатуру
+from .metrics import instrument_receiver
 
-def sync_update_filmwork(filmwork_id) -> None:
-    """Обновление фильма в Elasticsearch"""
-    try:
-        filmwork = Filmwork.objects.prefetch_related('genres', 'personfilmwork_set__person').get(
-            id=filmwork_id
-        )
-        elastic_service.index_filmwork(filmwork)
-    except Filmwork.DoesNotExist:
-        ...
-    except Exception as e:
-        ...
+
+def filmworks_changes(filmwork_ids: Iterable[UUID]) -> list[Change]:
+    """Изменения для переиндексации связанных фильмов"""
+    return [
+        Change(SyncEntity.FILMWORK, filmwork_id, SyncOperation.INDEX)
+        for filmwork_id in filmwork_ids
+    ]
+
+
+def deleted_with_entity(origin: object) -> bool:
+    """
+    Связь удаляется каскадно вместе с персоной или жанром. Документы её фильмов
+    обновляет удаление самой сущности, поэтому изменение на каждый фильм не нужно
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (Genre, Person)
 
 
 @receiver(post_save, sender=Filmwork)
+@instrument_receiver
 def filmwork_saved(sender: Type[Filmwork], instance: Filmwork, created: bool, **kwargs) -> None:
-    """При сохранении фильма"""
+    """
+    При сохранении фильма. Если изменились только скалярные поля документа,
+    в индексе обновляются только они, если поля документа не изменились — ничего.
+    """
+    changed = instance.changed_fields()
+    instance.remember_loaded_values()
     if created:
-        mongo_service = MongoDBService()
-        mongo_service.create_filmwork_by_id(instance.id)
-        elastic_service.index_filmwork(instance)
-    sync_update_filmwork(instance.id)
+        operation = SyncOperation.CREATE
+    elif changed is None:
+        operation = SyncOperation.INDEX
+    elif changed & Filmwork.document_fields:
+        operation = SyncOperation.UPDATE
+    else:
+        return
+    enqueue([Change(SyncEntity.FILMWORK, instance.id, operation)])
 
 
 @receiver(post_delete, sender=Filmwork)
+@instrument_receiver
 def filmwork_deleted(sender: Type[Filmwork], instance: Filmwork, **kwargs) -> None:
     """При удалении фильма"""
-    mongo_service = MongoDBService()
-    mongo_service.delete_filmwork_cascade_by_id(instance.id)
-    elastic_service.delete_filmwork(instance.id)
+    enqueue([Change(SyncEntity.FILMWORK, instance.id, SyncOperation.DELETE)])
 
 
 @receiver(post_save, sender=Person)
+@instrument_receiver
 def person_saved(sender: Type[Person], instance: Person, created: bool, **kwargs) -> None:
-    """При сохранении персоны"""
-    elastic_service.index_person(instance)
-    filmwork_ids = Filmwork.objects.filter(persons=instance).values_list('id', flat=True)
-    for filmwork_id in filmwork_ids:
-        sync_update_filmwork(filmwork_id)
-
-
-@receiver(pre_delete, sender=Genre)
-def genre_pre_delete(sender: Type[Genre], instance: Genre, **kwargs) -> None:
-    """Сохраняем информацию о связанных фильмах перед удалением жанра"""
-    instance._filmwork_ids = list(
-        Filmwork.objects.filter(genres=instance).values_list('id', flat=True)
-    )
+    """При сохранении персоны, связанные фильмы переиндексируются при синхронизации"""
+    enqueue([Change(SyncEntity.PERSON, instance.id, SyncOperation.INDEX)])
 
 
 @receiver(post_delete, sender=Genre)
+@instrument_receiver
 def genre_deleted(sender: Type[Genre], instance: Genre, **kwargs) -> None:
-    """При удалении жанра"""
-    try:
-        # Удаляем жанр из Elasticsearch
-        elastic_service.client.delete(index='genres', id=str(instance.id), refresh=True)
-    except Exception:
-        ...
-    filmwork_ids = getattr(instance, '_filmwork_ids', [])
-    for filmwork_id in filmwork_ids:
-        sync_update_filmwork(filmwork_id)
-
-
-@receiver(pre_delete, sender=Person)
-def person_pre_delete(sender: Type[Person], instance: Person, **kwargs) -> None:
-    """Сохраняем информацию о связанных фильмах перед удалением персоны"""
-    instance._filmwork_ids = list(
-        Filmwork.objects.filter(persons=instance).values_list('id', flat=True)
-    )
+    """При удалении жанра, он убирается из документов фильмов при синхронизации"""
+    enqueue([Change(SyncEntity.GENRE, instance.id, SyncOperation.DELETE)])
 
 
 @receiver(post_delete, sender=Person)
+@instrument_receiver
 def person_deleted(sender: Type[Person], instance: Person, **kwargs) -> None:
-    """При удалении персоны"""
-    try:
-        elastic_service.client.delete(index='persons', id=str(instance.id), refresh=True)
-    except Exception as e:
-        ...
-    filmwork_ids = getattr(instance, '_filmwork_ids', [])
-    for filmwork_id in filmwork_ids:
-        sync_update_filmwork(filmwork_id)
+    """При удалении персоны, она убирается из документов фильмов при синхронизации"""
+    enqueue([Change(SyncEntity.PERSON, instance.id, SyncOperation.DELETE)])
 
 
 @receiver(post_save, sender=Genre)
+@instrument_receiver
 def genre_saved(sender: Type[Genre], instance: Genre, created: bool, **kwargs) -> None:
-    """При сохранении жанра"""
-    elastic_service.index_genre(instance)
-    filmwork_ids = Filmwork.objects.filter(genres=instance).values_list('id', flat=True)
-
-    for filmwork_id in filmwork_ids:
-        sync_update_filmwork(filmwork_id)
+    """При сохранении жанра, связанные фильмы переиндексируются при синхронизации"""
+    enqueue([Change(SyncEntity.GENRE, instance.id, SyncOperation.INDEX)])
 
 
 @receiver(post_save, sender=GenreFilmwork)
 @receiver(post_delete, sender=GenreFilmwork)
+@instrument_receiver
 def genrefilmwork_changed(sender: Type[GenreFilmwork], instance: GenreFilmwork, **kwargs) -> None:
     """При изменении связи фильм-жанр"""
-    sync_update_filmwork(instance.film_work.id)
+    if deleted_with_entity(kwargs.get('origin')):
+        return
+    enqueue(filmworks_changes([instance.film_work_id]))
 
 
 @receiver(post_save, sender=PersonFilmwork)
 @receiver(post_delete, sender=PersonFilmwork)
+@instrument_receiver
 def personfilmwork_changed(
     sender: Type[PersonFilmwork], instance: PersonFilmwork, **kwargs
 ) -> None:
     """При изменении связи фильм-персона"""
-    sync_update_filmwork(instance.film_work.id)
+    if deleted_with_entity(kwargs.get('origin')):
+        return
+    enqueue(filmworks_changes([instance.film_work_id]))
@@ -0,0 +1,751 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any
+from uuid import UUID
+
+from asgiref.sync import sync_to_async
+
+from django.db import connections, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from config import settings
+from movies import metrics
+from movies.elastic import document_fingerprint, elastic_service
+from movies.enums import SyncEntity, SyncOperation
+from movies.models import (
+    Filmwork,
+    Genre,
+    GenreFilmwork,
+    IndexedDocument,
+    Person,
+    PersonFilmwork,
+    SyncOutbox,
+    SyncWatermark,
+)
+from movies.mongo import AsyncMongoDBService, MongoDBService
+from movies.utils import chunked, iterate_keyset
+
+logger = logging.getLogger(__name__)
+
+# Если над сущностью выполнено несколько операций, применяется самая сильная
+OPERATION_PRIORITY = {
+    SyncOperation.UPDATE: 0,
+    SyncOperation.INDEX: 1,
+    SyncOperation.CREATE: 2,
+    SyncOperation.DELETE: 3,
+}
+
+ENTITY_INDICES = {
+    SyncEntity.FILMWORK: 'movies',
+    SyncEntity.PERSON: 'persons',
+    SyncEntity.GENRE: 'genres',
+}
+
+# Имена персон и жанров, встроенные в документы фильмов: поле имени и связь с фильмом
+EMBEDDED_NAMES: dict[SyncEntity, tuple[str, type[PersonFilmwork] | type[GenreFilmwork], str]] = {
+    SyncEntity.PERSON: ('full_name', PersonFilmwork, 'person_id'),
+    SyncEntity.GENRE: ('name', GenreFilmwork, 'genre_id'),
+}
+
+
+class SyncError(Exception):
+    """Изменения не удалось применить к Elasticsearch или MongoDB."""
+
+
+@dataclass(frozen=True)
+class Change:
+    """Изменение сущности, которое нужно перенести в Elasticsearch и MongoDB."""
+
+    entity: SyncEntity
+    entity_id: UUID
+    operation: SyncOperation
+
+
+@dataclass
+class SyncStats:
+    """Счётчики синхронизации текущего процесса."""
+
+    # Изменения, поглощённые уже накопленными в транзакции
+    collapsed: int = 0
+    # Изменения, переданные на применение после схлопывания
+    dispatched: int = 0
+    # Документы, не отправленные в Elasticsearch, так как не изменились
+    unchanged: int = 0
+
+
+@dataclass
+class SyncPlan:
+    """Схлопнутые изменения, разложенные по видам операций."""
+
+    upserts: dict[SyncEntity, set[UUID]] = field(
+        default_factory=lambda: {entity: set() for entity in SyncEntity},
+    )
+    deletes: dict[SyncEntity, set[UUID]] = field(
+        default_factory=lambda: {entity: set() for entity in SyncEntity},
+    )
+    # Фильмы, у которых изменились только скалярные поля документа
+    updates: set[UUID] = field(default_factory=set)
+    # Новые фильмы, для которых нужен документ в MongoDB
+    created: set[UUID] = field(default_factory=set)
+
+    @classmethod
+    def from_collapsed(
+        cls,
+        collapsed: dict[tuple[SyncEntity, UUID], SyncOperation],
+    ) -> 'SyncPlan':
+        plan = cls()
+        for (entity, entity_id), operation in collapsed.items():
+            if operation == SyncOperation.DELETE:
+                plan.deletes[entity].add(entity_id)
+            elif operation == SyncOperation.UPDATE:
+                plan.updates.add(entity_id)
+            else:
+                plan.upserts[entity].add(entity_id)
+                if operation == SyncOperation.CREATE and entity == SyncEntity.FILMWORK:
+                    plan.created.add(entity_id)
+        return plan
+
+
+stats = SyncStats()
+
+_local = threading.local()
+
+# Цикл событий ASGI-сервера, в котором применяются изменения в режиме async
+_loop: asyncio.AbstractEventLoop | None = None
+_scheduled: set[Future[None]] = set()
+
+
+class PendingChanges:
+    """Изменения, накопленные в текущей транзакции и ещё не применённые."""
+
+    def __init__(self) -> None:
+        self.operations: dict[tuple[SyncEntity, UUID], SyncOperation] = {}
+
+    def add(self, changes: Iterable[Change]) -> list[Change]:
+        """Добавляет изменения и возвращает те, что ещё не были учтены."""
+        added = []
+        for change in changes:
+            key = (change.entity, change.entity_id)
+            current = self.operations.get(key)
+            if current is not None and (
+                OPERATION_PRIORITY[change.operation] <= OPERATION_PRIORITY[current]
+            ):
+                stats.collapsed += 1
+                metrics.sync_collapsed.inc()
+                continue
+            self.operations[key] = change.operation
+            added.append(change)
+        return added
+
+    def add_ids(
+        self,
+        entity: SyncEntity,
+        entity_ids: Iterable[UUID],
+        operation: SyncOperation = SyncOperation.INDEX,
+    ) -> None:
+        """Добавляет одинаковые изменения сущностей по их id."""
+        self.add(Change(entity, entity_id, operation) for entity_id in entity_ids)
+
+    def changes(self) -> list[Change]:
+        return [
+            Change(entity, entity_id, operation)
+            for (entity, entity_id), operation in self.operations.items()
+        ]
+
+    def flush(self) -> None:
+        """Применяет накопленные изменения после фиксации транзакции."""
+        if getattr(_local, 'pending', None) is self:
+            _local.pending = None
+        if settings.SYNC_MODE != 'outbox':
+            _apply_inline(self.changes())
+
+
+def enqueue(changes: Iterable[Change]) -> None:
+    """
+    Регистрирует изменения моделей.
+    Внутри транзакции изменения накапливаются и схлопываются, чтобы каждая сущность
+    синхронизировалась один раз. В режиме `outbox` они записываются в таблицу
+    в той же транзакции и применяются командой `sync_worker`, в режиме `inline`
+    применяются одной пачкой после фиксации транзакции, в режиме `async` —
+    так же, но в цикле событий ASGI-сервера, без ожидания в запросе.
+    """
+    changes = list(changes)
+    if not changes:
+        return
+    deferred = _deferred()
+    if deferred is not None:
+        deferred.add(changes)
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        changes = _pending_changes(connection).add(changes)
+    if not changes:
+        return
+    stats.dispatched += len(changes)
+    metrics.sync_dispatched.inc(len(changes))
+    if settings.SYNC_MODE == 'outbox':
+        SyncOutbox.objects.bulk_create(
+            (
+                SyncOutbox(
+                    entity=change.entity,
+                    entity_id=change.entity_id,
+                    operation=change.operation,
+                )
+                for change in changes
+            ),
+            batch_size=settings.SYNC_BATCH_SIZE,
+        )
+    elif not connection.in_atomic_block:
+        _apply_inline(changes)
+
+
+@contextmanager
+def deferred_sync() -> Iterator[PendingChanges]:
+    """
+    Откладывает синхронизацию до выхода из блока; работает и как декоратор.
+    Внутри блока обработчики сигналов только запоминают затронутые сущности,
+    а при выходе изменения регистрируются одной пачкой, даже если блок
+    завершился ошибкой: уже записанные строки должны попасть в индекс.
+    Изменения в обход сигналов (`QuerySet.update`, `bulk_create`)
+    добавляются вручную:
+
+        with deferred_sync() as touched:
+            Filmwork.objects.filter(...).update(rating=None)
+            touched.add_ids(SyncEntity.FILMWORK, filmwork_ids)
+    """
+    pending = PendingChanges()
+    _deferred_stack().append(pending)
+    try:
+        yield pending
+    finally:
+        _deferred_stack().pop()
+        enqueue(pending.changes())
+
+
+def sync_deferred() -> bool:
+    """Выполняется ли код внутри `deferred_sync`"""
+    return _deferred() is not None
+
+
+def collapse(changes: Iterable[Change]) -> dict[tuple[SyncEntity, UUID], SyncOperation]:
+    """Оставляет по одной, самой сильной, операции на сущность."""
+    collapsed: dict[tuple[SyncEntity, UUID], SyncOperation] = {}
+    for change in changes:
+        key = (change.entity, change.entity_id)
+        current = collapsed.get(key)
+        if current is None or OPERATION_PRIORITY[change.operation] > OPERATION_PRIORITY[current]:
+            collapsed[key] = change.operation
+    return collapsed
+
+
+def apply_changes(changes: Iterable[Change], force: bool = False) -> None:
+    """
+    Применяет пачку изменений к Elasticsearch и MongoDB bulk-запросами.
+    С `force` документы отправляются, даже если не изменились.
+    """
+    collapsed = collapse(changes)
+    metrics.sync_batch_size.observe(len(collapsed))
+    with metrics.track(metrics.sync_seconds, metrics.sync_errors):
+        _apply_collapsed(collapsed, force)
+
+
+async def apply_changes_async(changes: Iterable[Change], force: bool = False) -> None:
+    """
+    Применяет пачку изменений, как `apply_changes`, но MongoDB обновляется
+    асинхронным клиентом одновременно с Elasticsearch. Документы Elasticsearch
+    строятся запросами ORM, поэтому эта часть выполняется в отдельном потоке.
+    """
+    collapsed = collapse(changes)
+    metrics.sync_batch_size.observe(len(collapsed))
+    with metrics.track(metrics.sync_seconds, metrics.sync_errors):
+        plan = SyncPlan.from_collapsed(collapsed)
+        elastic_errors, mongo_errors = await asyncio.gather(
+            sync_to_async(_apply_elastic_in_thread, thread_sensitive=False)(plan, force),
+            _apply_mongo_async(plan),
+        )
+        if elastic_errors or mongo_errors:
+            raise SyncError(elastic_errors + mongo_errors)
+
+
+def bind_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Запоминает цикл событий ASGI-сервера для режима `async`"""
+    global _loop
+    _loop = loop
+
+
+async def wait_scheduled() -> None:
+    """Дожидается изменений, переданных в цикл событий и ещё не применённых"""
+    if _scheduled:
+        await asyncio.wait([asyncio.wrap_future(future) for future in list(_scheduled)])
+
+
+def _apply_collapsed(
+    collapsed: dict[tuple[SyncEntity, UUID], SyncOperation],
+    force: bool,
+) -> None:
+    plan = SyncPlan.from_collapsed(collapsed)
+    errors = _apply_elastic(plan, force) + _apply_mongo(plan)
+    if errors:
+        raise SyncError(errors)
+
+
+def _apply_elastic(plan: SyncPlan, force: bool) -> list[object]:
+    errors: list[object] = []
+    try:
+        for entity, entity_ids in plan.deletes.items():
+            if entity_ids and entity in EMBEDDED_NAMES:
+                entity_errors = _remove_embedded(entity, entity_ids)
+                if entity_errors:
+                    # Названия жанров берутся из их документов, поэтому те удаляются позже
+                    errors += entity_errors
+                    continue
+            if entity_ids:
+                errors += elastic_service.bulk_delete(ENTITY_INDICES[entity], entity_ids)
+                IndexedDocument.objects.filter(
+                    index=ENTITY_INDICES[entity],
+                    entity_id__in=entity_ids,
+                ).delete()
+        fan_out: dict[SyncEntity, set[UUID]] = {}
+        for entity in (SyncEntity.PERSON, SyncEntity.GENRE):
+            entity_errors, fan_out[entity] = _index_embedded(entity, plan.upserts[entity], force)
+            errors += entity_errors
+        filmwork_errors, indexed = _index_filmworks(
+            plan.upserts[SyncEntity.FILMWORK], fan_out, force
+        )
+        errors += filmwork_errors
+        errors += _update_filmworks(plan.updates - indexed, force)
+    except Exception as e:
+        errors.append(e)
+    return errors
+
+
+def _apply_elastic_in_thread(plan: SyncPlan, force: bool) -> list[object]:
+    """Применяет изменения к Elasticsearch вне запроса, закрывая соединения потока с базой"""
+    try:
+        return _apply_elastic(plan, force)
+    finally:
+        connections.close_all()
+
+
+def _apply_mongo(plan: SyncPlan) -> list[object]:
+    mongo_service = MongoDBService()
+    try:
+        mongo_service.create_filmworks(plan.created)
+        for chunk in chunked(sorted(plan.deletes[SyncEntity.FILMWORK]), settings.SYNC_CHUNK_SIZE):
+            mongo_service.delete_filmworks_cascade(chunk)
+    except Exception as e:
+        return [e]
+    return []
+
+
+async def _apply_mongo_async(plan: SyncPlan) -> list[object]:
+    mongo_service = AsyncMongoDBService()
+    try:
+        await mongo_service.create_filmworks(plan.created)
+        for chunk in chunked(sorted(plan.deletes[SyncEntity.FILMWORK]), settings.SYNC_CHUNK_SIZE):
+            await mongo_service.delete_filmworks_cascade(chunk)
+    except Exception as e:
+        return [e]
+    return []
+
+
+def delete_filmworks(
+    queryset: QuerySet[Filmwork],
+    chunk_size: int = settings.SYNC_CHUNK_SIZE,
+) -> int:
+    """
+    Удаляет фильмы пачками, каждую пачку в своей транзакции.
+    Удаление фильмов пачки регистрируется до удаления строк, поэтому изменения
+    каскадно удаляемых связей поглощаются им и не вызывают переиндексацию
+    удаляемых фильмов. После фиксации пачка удаляется из Elasticsearch и MongoDB
+    bulk-запросами. Возвращает число удалённых фильмов.
+    """
+    deleted = 0
+    for batch in iterate_keyset(queryset.only('id'), chunk_size):
+        filmwork_ids = [filmwork.id for filmwork in batch]
+        with transaction.atomic():
+            enqueue(
+                Change(SyncEntity.FILMWORK, filmwork_id, SyncOperation.DELETE)
+                for filmwork_id in filmwork_ids
+            )
+            Filmwork.objects.filter(id__in=filmwork_ids).delete()
+        deleted += len(filmwork_ids)
+    return deleted
+
+
+def process_outbox(batch_size: int = settings.SYNC_BATCH_SIZE) -> int:
+    """
+    Применяет очередную пачку изменений из очереди.
+    Записи удаляются только после успешного применения, поэтому доставка
+    гарантируется «хотя бы один раз». Если пачка не применилась, она делится
+    пополам, пока ошибка не сведётся к отдельным записям. У таких записей
+    растёт счётчик попыток, и они выбираются после новых, а после
+    `SYNC_MAX_ATTEMPTS` неудач переносятся в «мёртвые» и больше не обрабатываются.
+    Возвращает число применённых записей.
+    """
+    with transaction.atomic():
+        rows = list(
+            SyncOutbox.objects.select_for_update(skip_locked=True)
+            .filter(dead_at__isnull=True)
+            .order_by('attempts', 'id')[:batch_size],
+        )
+        if not rows:
+            return 0
+        failed = _apply_rows(rows)
+        for row, error in failed:
+            _record_failure(row, error)
+        failed_ids = {row.id for row, _ in failed}
+        SyncOutbox.objects.filter(
+            id__in=[row.id for row in rows if row.id not in failed_ids],
+        ).delete()
+    return len(rows) - len(failed)
+
+
+def _apply_rows(rows: list[SyncOutbox]) -> list[tuple[SyncOutbox, Exception]]:
+    """Применяет записи очереди, деля пачку пополам при ошибке. Возвращает неудачные"""
+    try:
+        with transaction.atomic():
+            apply_changes(
+                Change(SyncEntity(row.entity), row.entity_id, SyncOperation(row.operation))
+                for row in rows
+            )
+    except Exception as e:
+        if len(rows) == 1:
+            return [(rows[0], e)]
+        middle = len(rows) // 2
+        return _apply_rows(rows[:middle]) + _apply_rows(rows[middle:])
+    return []
+
+
+def _record_failure(row: SyncOutbox, error: Exception) -> None:
+    row.attempts += 1
+    row.last_error = str(error)
+    if row.attempts >= settings.SYNC_MAX_ATTEMPTS:
+        row.dead_at = timezone.now()
+        metrics.sync_outbox_dead.inc()
+        logger.error(f'Изменение {row} перенесено в мёртвые после {row.attempts} попыток: {error}')
+    else:
+        logger.warning(f'Изменение {row} не применено, попытка {row.attempts}: {error}')
+    row.save(update_fields=['attempts', 'last_error', 'dead_at'])
+
+
+def sync_incremental(
+    index: str,
+    overlap: timedelta = timedelta(seconds=settings.SYNC_WATERMARK_OVERLAP),
+    batch_size: int = settings.SYNC_CHUNK_SIZE,
+    force: bool = False,
+) -> int:
+    """
+    Переносит в индекс объекты, изменённые после сохранённой отметки, и сдвигает её.
+    Отметка уменьшается на `overlap`, чтобы не пропустить строки из транзакций,
+    зафиксированных позже начала прошлого прохода. Удаления этим способом
+    не обнаруживаются. Возвращает число отправленных документов.
+    """
+    started = timezone.now()
+    watermark = SyncWatermark.objects.filter(index=index).first()
+    since = watermark.synced_until - overlap if watermark else None
+    sent = index_changed_since(index, since, batch_size, force)
+    SyncWatermark.objects.update_or_create(index=index, defaults={'synced_until': started})
+    return sent
+
+
+def index_changed_since(
+    index: str,
+    since: datetime | None,
+    batch_size: int = settings.SYNC_CHUNK_SIZE,
+    force: bool = False,
+) -> int:
+    """
+    Переносит в индекс bulk-запросами объекты, изменённые после `since`
+    (все объекты, если `since` не указан). Возвращает число проверенных документов.
+    """
+    sent = 0
+    with elastic_service.bulk_mode():
+        for documents in elastic_service.iter_documents(index, batch_size, since=since):
+            errors = send_documents(index, documents, force)
+            if errors:
+                raise SyncError(errors)
+            sent += len(documents)
+    return sent
+
+
+def send_documents(
+    index: str,
+    documents: list[dict[str, Any]],
+    force: bool = False,
+    thread_count: int = settings.ELASTICSEARCH_BULK_THREADS,
+) -> list[object]:
+    """
+    Отправляет в индекс документы, отпечаток которых отличается от последнего
+    отправленного, и запоминает отпечатки принятых документов. С `force`
+    или при выключенном `SYNC_SKIP_UNCHANGED` отправляются все документы.
+    Время проверки `indexed_at` обновляется и у пропущенных документов: по нему
+    сверка отличает актуальные документы от изменённых после отправки.
+    Возвращает ошибки.
+    """
+    now = timezone.now()
+    fingerprints = {document['id']: document_fingerprint(document) for document in documents}
+    if settings.SYNC_SKIP_UNCHANGED and not force:
+        indexed = IndexedDocument.objects.filter(index=index, entity_id__in=list(fingerprints))
+        unchanged = {
+            str(entity_id)
+            for entity_id, fingerprint in indexed.values_list('entity_id', 'fingerprint')
+            if fingerprints[str(entity_id)] == fingerprint
+        }
+        documents = [document for document in documents if document['id'] not in unchanged]
+        if unchanged:
+            indexed.filter(entity_id__in=unchanged).update(indexed_at=now)
+        stats.unchanged += len(unchanged)
+        metrics.sync_unchanged.inc(len(unchanged))
+    if not documents:
+        return []
+
+    documents = [
+        {**document, 'fingerprint': fingerprints[document['id']]} for document in documents
+    ]
+    return [
+        info
+        for ok, info in elastic_service.bulk_index(
+            index, documents, thread_count=thread_count, record=True
+        )
+        if not ok
+    ]
+
+
+def provision_filmworks(
+    since: datetime | None = None,
+    batch_size: int = settings.SYNC_CHUNK_SIZE,
+) -> int:
+    """
+    Создаёт в MongoDB недостающие документы фильмов, изменённых после `since`
+    (всех фильмов, если `since` не указан). Фильмы обходятся пачками по id,
+    каждая пачка сверяется с коллекцией одним запросом. Возвращает число
+    созданных документов.
+    """
+    queryset = Filmwork.objects.only('id')
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    provisioned = 0
+    mongo_service = MongoDBService()
+    for batch in iterate_keyset(queryset, batch_size):
+        provisioned += mongo_service.provision_filmworks([filmwork.id for filmwork in batch])
+    return provisioned
+
+
+def _deferred_stack() -> list[PendingChanges]:
+    if not hasattr(_local, 'deferred'):
+        _local.deferred = []
+    stack: list[PendingChanges] = _local.deferred
+    return stack
+
+
+def _deferred() -> PendingChanges | None:
+    stack = getattr(_local, 'deferred', None)
+    return stack[-1] if stack else None
+
+
+def _pending_changes(connection: BaseDatabaseWrapper) -> PendingChanges:
+    """Возвращает изменения текущей транзакции, регистрируя их сброс при фиксации."""
+    pending = getattr(_local, 'pending', None)
+    # После отката транзакции обработчик on_commit отбрасывается вместе с изменениями.
+    # Записи run_on_commit — (savepoints, функция, robust), в django-stubs описаны парами
+    if pending is None or not any(entry[1] == pending.flush for entry in connection.run_on_commit):
+        pending = _local.pending = PendingChanges()
+        transaction.on_commit(pending.flush, robust=True)
+    return pending
+
+
+def _apply_inline(changes: list[Change]) -> None:
+    if settings.SYNC_MODE == 'async' and _loop is not None and _loop.is_running():
+        _schedule(changes, _loop)
+        return
+    try:
+        apply_changes(changes)
+    except SyncError as e:
+        logger.error(f'Ошибка синхронизации: {e}')
+
+
+def _schedule(changes: list[Change], loop: asyncio.AbstractEventLoop) -> None:
+    """Передаёт изменения в цикл событий ASGI-сервера, не дожидаясь применения"""
+    future = asyncio.run_coroutine_threadsafe(apply_changes_async(changes), loop)
+    _scheduled.add(future)
+    future.add_done_callback(_scheduled_done)
+
+
+def _scheduled_done(future: Future[None]) -> None:
+    _scheduled.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f'Ошибка синхронизации: {future.exception()}')
+
+
+def _index_filmworks(
+    filmwork_ids: set[UUID],
+    fan_out: dict[SyncEntity, set[UUID]],
+    force: bool,
+) -> tuple[list[object], set[UUID]]:
+    """
+    Переиндексирует изменённые фильмы и фильмы, связанные с персонами и жанрами
+    из `fan_out`. Фильмы обрабатываются пачками с фиксированным числом запросов
+    на пачку, поэтому стоимость зависит от числа пачек, а не фильмов.
+    Возвращает ошибки и id переиндексированных фильмов.
+    """
+    errors: list[object] = []
+    indexed: set[UUID] = set()
+    chunks = chain(
+        chunked(sorted(filmwork_ids), settings.SYNC_CHUNK_SIZE),
+        *(
+            _linked_filmwork_ids(EMBEDDED_NAMES[entity][1], EMBEDDED_NAMES[entity][2], entity_ids)
+            for entity, entity_ids in fan_out.items()
+        ),
+    )
+    for chunk in chunks:
+        chunk_ids = set(chunk) - indexed
+        if chunk_ids:
+            errors += _index(SyncEntity.FILMWORK, chunk_ids, force)
+            indexed |= chunk_ids
+    return errors, indexed
+
+
+def _update_filmworks(filmwork_ids: set[UUID], force: bool) -> list[object]:
+    """
+    Частично обновляет документы фильмов, у которых изменились только скалярные поля.
+    Связи не загружаются; фильмы, которых ещё нет в индексе, индексируются целиком.
+    """
+    errors: list[object] = []
+    for chunk in chunked(sorted(filmwork_ids), settings.SYNC_CHUNK_SIZE):
+        # Отпечаток описывает документ целиком: после частичного обновления он убирается
+        # и из документа, и из IndexedDocument, чтобы сверка не считала документ устаревшим
+        documents = [
+            {**document, 'fingerprint': None}
+            for document in elastic_service.build_filmwork_partial_documents(chunk)
+        ]
+        update_errors, missing = elastic_service.bulk_update('movies', documents)
+        errors += update_errors
+        IndexedDocument.objects.filter(index='movies', entity_id__in=chunk).delete()
+        if missing:
+            errors += _index(
+                SyncEntity.FILMWORK, {UUID(filmwork_id) for filmwork_id in missing}, force
+            )
+    return errors
+
+
+def _index_embedded(
+    entity: SyncEntity,
+    entity_ids: set[UUID],
+    force: bool,
+) -> tuple[list[object], set[UUID]]:
+    """
+    Индексирует персоны или жанры и переносит изменённые имена в документы фильмов
+    запросами `update_by_query`, не перестраивая документы из базы.
+    Старые имена берутся из индекса сущности, поэтому переименование выполняется
+    до её индексации: при ошибке оно повторится вместе с изменением.
+    Возвращает ошибки и id сущностей, которых нет в индексе: их фильмы
+    нужно переиндексировать целиком.
+    """
+    if not entity_ids:
+        return [], set()
+    field, link_model, link_field = EMBEDDED_NAMES[entity]
+    index = ENTITY_INDICES[entity]
+    model = Person if entity == SyncEntity.PERSON else Genre
+    names = dict(model.objects.filter(id__in=entity_ids).values_list('id', field))
+
+    errors: list[object] = []
+    missing: set[UUID] = set()
+    renamed: dict[UUID, tuple[str, str]] = {}
+    for chunk in chunked(sorted(names), settings.SYNC_CHUNK_SIZE):
+        indexed = elastic_service.indexed_names(
+            index, field, [str(entity_id) for entity_id in chunk]
+        )
+        for entity_id in chunk:
+            old_name = indexed.get(str(entity_id))
+            if old_name is None:
+                missing.add(entity_id)
+            elif old_name != names[entity_id]:
+                renamed[entity_id] = (old_name, names[entity_id])
+
+    for chunk in chunked(sorted(renamed), settings.SYNC_CHUNK_SIZE):
+        if entity == SyncEntity.PERSON:
+            errors += elastic_service.rename_persons(
+                {str(entity_id): renamed[entity_id][1] for entity_id in chunk},
+            )
+        else:
+            errors += elastic_service.rename_genres(dict(renamed[entity_id] for entity_id in chunk))
+        IndexedDocument.objects.filter(
+            index='movies',
+            entity_id__in=link_model.objects.filter(**{f'{link_field}__in': chunk}).values(
+                'film_work_id'
+            ),
+        ).delete()
+    if errors:
+        return errors, missing
+    return _index(entity, entity_ids, force), missing
+
+
+def _remove_embedded(entity: SyncEntity, entity_ids: set[UUID]) -> list[object]:
+    """
+    Убирает удалённые персоны или жанры из документов фильмов запросами
+    `update_by_query`. Связи к этому времени удалены каскадно, поэтому фильмы
+    находятся по документам, а не по базе. Жанры в документах фильмов хранятся
+    названиями, они берутся из индекса жанров. Возвращает ошибки.
+    """
+    errors: list[object] = []
+    field = EMBEDDED_NAMES[entity][0]
+    for chunk in chunked(sorted(entity_ids), settings.SYNC_CHUNK_SIZE):
+        ids = [str(entity_id) for entity_id in chunk]
+        if entity == SyncEntity.PERSON:
+            errors += elastic_service.remove_persons(ids)
+            continue
+        names = elastic_service.indexed_names(ENTITY_INDICES[entity], field, ids)
+        if names:
+            errors += elastic_service.remove_genres(list(names.values()))
+    return errors
+
+
+def _linked_filmwork_ids(
+    model: type[PersonFilmwork] | type[GenreFilmwork],
+    field: str,
+    entity_ids: set[UUID],
+) -> Iterator[list[UUID]]:
+    """Пачками обходит фильмы, связанные с сущностями, по возрастанию id"""
+    if not entity_ids:
+        return
+    queryset = (
+        model.objects.filter(**{f'{field}__in': entity_ids})
+        .order_by('film_work_id')
+        .values_list('film_work_id', flat=True)
+        .distinct()
+    )
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(film_work_id__gt=last_id)
+        chunk = list(page[: settings.SYNC_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def _index(entity: SyncEntity, entity_ids: set[UUID], force: bool) -> list[object]:
+    """Строит документы сущностей и отправляет их в Elasticsearch."""
+    if entity == SyncEntity.FILMWORK:
+        documents = elastic_service.build_filmwork_documents(entity_ids)
+    elif entity == SyncEntity.PERSON:
+        documents = [
+            elastic_service._person_to_document(person)
+            for person in Person.objects.filter(id__in=entity_ids)
+        ]
+    else:
+        documents = [
+            elastic_service._genre_to_document(genre)
+            for genre in Genre.objects.filter(id__in=entity_ids)
+        ]
+    return send_documents(ENTITY_INDICES[entity], documents, force, thread_count=1)
@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from movies.enums import PersonRole
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from movies.utils import chunked
+
+GENRES_PER_FILMWORK = 2
+PERSONS_PER_FILMWORK = 3
+
+
+class ChangelistQueryCountTest(TestCase):
+    """Число запросов списка не зависит от числа строк на странице."""
+
+    user: User
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def create_filmworks(self, count: int) -> None:
+        """Фильмы со связями. bulk_create не вызывает сигналы синхронизации"""
+        batch = Filmwork.objects.count()
+        filmworks = Filmwork.objects.bulk_create(
+            Filmwork(title=f'Фильм {batch}-{number}') for number in range(count)
+        )
+        genres = Genre.objects.bulk_create(
+            Genre(name=f'Жанр {batch}-{number}') for number in range(count * GENRES_PER_FILMWORK)
+        )
+        persons = Person.objects.bulk_create(
+            Person(full_name=f'Персона {batch}-{number}')
+            for number in range(count * PERSONS_PER_FILMWORK)
+        )
+        GenreFilmwork.objects.bulk_create(
+            GenreFilmwork(film_work=filmwork, genre=genre)
+            for filmwork, chunk in zip(filmworks, chunked(genres, GENRES_PER_FILMWORK))
+            for genre in chunk
+        )
+        PersonFilmwork.objects.bulk_create(
+            PersonFilmwork(film_work=filmwork, person=person, role=PersonRole.ACTOR)
+            for filmwork, chunk in zip(filmworks, chunked(persons, PERSONS_PER_FILMWORK))
+            for person in chunk
+        )
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_filmwork_changelist(self) -> None:
+        url = reverse('admin:movies_filmwork_changelist')
+        self.create_filmworks(5)
+        expected = self.count_queries(url)
+        self.create_filmworks(45)
+        with self.assertNumQueries(expected):
+            response = self.client.get(url)
+        self.assertContains(response, 'Персона 5-134')
+
+    def test_person_changelist(self) -> None:
+        url = reverse('admin:movies_person_changelist')
+        self.create_filmworks(5)
+        expected = self.count_queries(url)
+        self.create_filmworks(45)
+        with self.assertNumQueries(expected):
+            self.client.get(url)
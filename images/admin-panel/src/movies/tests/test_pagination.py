@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from movies.models import Filmwork, Genre
+from movies.pagination import EstimatedCountPaginator
+
+ROWS = 25
+PER_PAGE = 10
+
+
+@mock.patch('movies.pagination.estimate_count', return_value=1_000_000)
+class EstimatedCountPaginatorTest(TestCase):
+    """Страницы по завышенной оценке числа строк."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        Genre.objects.bulk_create(Genre(name=f'Жанр {number}') for number in range(ROWS))
+
+    def paginator(self) -> EstimatedCountPaginator:
+        return EstimatedCountPaginator(Genre.objects.order_by('name'), PER_PAGE)
+
+    def test_page_within_rows(self, estimate: mock.Mock) -> None:
+        paginator = self.paginator()
+        page = paginator.page(2)
+        self.assertEqual(len(page.object_list), PER_PAGE)
+        self.assertTrue(paginator.estimated)
+        self.assertIsNone(paginator.clamped)
+
+    def test_empty_page_is_clamped_to_last(self, estimate: mock.Mock) -> None:
+        paginator = self.paginator()
+        page = paginator.page(paginator.num_pages)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page.object_list), ROWS - 2 * PER_PAGE)
+        self.assertEqual(paginator.clamped, 3)
+        self.assertEqual(paginator.count, ROWS)
+        self.assertFalse(paginator.estimated)
+
+    def test_page_links_skip_estimated_end(self, estimate: mock.Mock) -> None:
+        paginator = self.paginator()
+        paginator.page(1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, paginator.ELLIPSIS],
+        )
+        paginator.page(3)
+        self.assertEqual(list(paginator.get_elided_page_range(3)), [1, 2, 3])
+
+
+class KeysetChangeListCountTest(TestCase):
+    """Число строк списка с переходом по ключу помечено как оценка, только если это оценка."""
+
+    user: User
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        Filmwork.objects.bulk_create(Filmwork(title=f'Фильм {number}') for number in range(ROWS))
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def test_exact_count(self) -> None:
+        response = self.client.get(reverse('admin:movies_filmwork_changelist'))
+        self.assertTrue(response.context['cl'].keyset)
+        self.assertContains(response, f'{ROWS} ')
+        self.assertNotContains(response, f'~{ROWS}')
+
+    @mock.patch('movies.pagination.estimate_count', return_value=1_000_000)
+    def test_estimated_count(self, estimate: mock.Mock) -> None:
+        response = self.client.get(reverse('admin:movies_filmwork_changelist'))
+        self.assertTrue(response.context['cl'].keyset)
+        self.assertContains(response, '~1000000 ')
@@ -0,0 +1,214 @@
+import fnmatch
+import json
+from collections import defaultdict
+from typing import Any
+from unittest import mock
+from uuid import UUID
+
+from elastic_transport import HeadApiResponse, ObjectApiResponse
+
+from django.test import TestCase
+
+from movies.elastic import ElasticsearchStartUpService
+from movies.enums import PersonRole, SyncEntity, SyncOperation
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+from movies.reconcile import CHECKSUM_DIGITS, Reconciler, id_checksum, targets
+from movies.sync import Change, apply_changes
+
+# Относительный импорт: mypy проверяет пакет как `src.movies` и без него не видит базовый класс
+from ..benchmarks.standins import InMemoryElasticsearch, _response_meta
+
+FILMWORKS = 12
+BATCH_SIZE = 5
+
+
+class VersionedElasticsearch(InMemoryElasticsearch):
+    """
+    Заглушка Elasticsearch с версиями индексов, алиасами и поиском для сверки.
+    Корзины сверки считаются на Python по той же формуле, что и `CHECKSUM_SCRIPT`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.settings: dict[str, dict[str, Any]] = defaultdict(dict)
+        self.aliases: dict[str, set[str]] = defaultdict(set)
+
+    def perform_request(  # type: ignore[override]
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        body: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        parts = [part for part in path.split('/') if part]
+        if parts[-1] in ('_bulk', '_refresh', '_update_by_query'):
+            return super().perform_request(
+                method, path, params=params, headers=headers, body=body, **kwargs
+            )
+        if parts[0] == '_aliases':
+            self._update_aliases(body['actions'])
+            return self._response({'acknowledged': True})
+        if parts[0] == '_alias':
+            found: dict[str, Any] = {
+                index: {'aliases': {parts[1]: {}}} for index in self.aliases[parts[1]]
+            }
+            if method == 'HEAD':
+                return HeadApiResponse(_response_meta(200 if found else 404))
+            return self._response(found)
+        if parts[:2] == ['_search', 'scroll']:
+            return self._response(self._hits([]))
+        if len(parts) == 1:
+            return self._index_request(method, parts[0], body)
+        if parts[1] == '_settings':
+            return self._settings_request(method, self._resolve(parts[0]), body)
+        if parts[1] == '_search':
+            return self._response(self._search(self._resolve(parts[0]), body))
+        if parts[1] == '_count':
+            count = sum(len(self.indices_data[name]) for name in self._resolve(parts[0]))
+            return self._response({'count': count})
+        return self._response({'acknowledged': True})
+
+    def _response(self, body: dict[str, Any]) -> ObjectApiResponse[Any]:
+        return ObjectApiResponse(body, _response_meta())
+
+    def _resolve(self, name: str) -> list[str]:
+        if self.aliases.get(name):
+            return sorted(self.aliases[name])
+        return [index for index in self.indices_data if fnmatch.fnmatch(index, name)]
+
+    def _index_request(self, method: str, name: str, body: Any) -> Any:
+        if method == 'HEAD':
+            exists = name in self.indices_data or bool(self.aliases.get(name))
+            return HeadApiResponse(_response_meta(200 if exists else 404))
+        if method == 'PUT':
+            self.indices_data[name] = {}
+        elif method == 'DELETE':
+            del self.indices_data[name]
+        return self._response({index: {} for index in self._resolve(name)})
+
+    def _settings_request(self, method: str, names: list[str], body: Any) -> Any:
+        if method == 'PUT':
+            for name in names:
+                self.settings[name].update(body)
+        return self._response(
+            {
+                name: {
+                    'settings': {
+                        f'index.{key}': value for key, value in self.settings[name].items()
+                    },
+                }
+                for name in names
+            },
+        )
+
+    def _update_aliases(self, actions: list[dict[str, Any]]) -> None:
+        for action in actions:
+            ((operation, target),) = action.items()
+            if operation == 'add':
+                self.aliases[target['alias']].add(target['index'])
+            elif operation == 'remove':
+                self.aliases[target['alias']].discard(target['index'])
+
+    def _bulk(self, body: Any) -> dict[str, Any]:
+        """Переводит имена алиасов в операциях на их физические индексы."""
+        if isinstance(body, (bytes, str)):
+            body = body.splitlines()
+        lines = [
+            json.loads(line) if isinstance(line, (bytes, str)) else line for line in body if line
+        ]
+        for line in lines:
+            for meta in line.values():
+                if isinstance(meta, dict) and '_index' in meta:
+                    (meta['_index'],) = self._resolve(meta['_index'])
+        return super()._bulk(lines)
+
+    def _search(self, names: list[str], body: dict[str, Any]) -> dict[str, Any]:
+        prefix = body['query'].get('prefix', {}).get('id', '')
+        documents = [
+            document
+            for name in names
+            for document in self.indices_data[name].values()
+            if document['id'].startswith(prefix)
+        ]
+        if 'aggs' not in body:
+            return self._hits(documents)
+        buckets: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        for document in documents:
+            bucket = buckets[document['id'][: len(prefix) + 1]]
+            bucket[0] += 1
+            bucket[1] += id_checksum(UUID(document['id']))
+            if document.get('fingerprint'):
+                bucket[1] += int(document['fingerprint'][:CHECKSUM_DIGITS], 16)
+        return {
+            'aggregations': {
+                'buckets': {
+                    'buckets': [
+                        {'key': key, 'doc_count': count, 'checksum': {'value': checksum}}
+                        for key, (count, checksum) in buckets.items()
+                    ],
+                },
+            },
+        }
+
+    def _hits(self, documents: list[dict[str, Any]]) -> dict[str, Any]:
+        return {
+            '_scroll_id': 'scroll',
+            '_shards': {'total': 1, 'successful': 1, 'skipped': 0, 'failed': 0},
+            'hits': {
+                'hits': [{'_id': document['id'], '_source': document} for document in documents],
+            },
+        }
+
+
+class RebuildReconcileTest(TestCase):
+    """Сверка после перестройки индексов не находит расхождений."""
+
+    def setUp(self) -> None:
+        patcher = mock.patch(
+            'movies.elastic.get_elasticsearch', return_value=VersionedElasticsearch()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # bulk_create не вызывает сигналы синхронизации
+        filmworks = Filmwork.objects.bulk_create(
+            Filmwork(title=f'Фильм {number}', rating=number) for number in range(FILMWORKS)
+        )
+        genres = Genre.objects.bulk_create(Genre(name=f'Жанр {number}') for number in range(3))
+        persons = Person.objects.bulk_create(
+            Person(full_name=f'Персона {number}') for number in range(4)
+        )
+        GenreFilmwork.objects.bulk_create(
+            GenreFilmwork(film_work=filmwork, genre=genres[number % len(genres)])
+            for number, filmwork in enumerate(filmworks)
+        )
+        PersonFilmwork.objects.bulk_create(
+            PersonFilmwork(
+                film_work=filmwork, person=persons[number % len(persons)], role=PersonRole.ACTOR
+            )
+            for number, filmwork in enumerate(filmworks)
+        )
+        self.filmworks = filmworks
+        startup = ElasticsearchStartUpService()
+        for index in ('genres', 'persons', 'movies'):
+            startup.rebuild_index(index, BATCH_SIZE, thread_count=1)
+
+    def reconcile(self, name: str) -> dict[str, int]:
+        counts = Reconciler(targets()[name], leaf_size=BATCH_SIZE).run()
+        return {
+            key: counts[key]
+            for key in ('mismatched', 'missing', 'orphaned', 'stale', 'created', 'refreshed')
+        }
+
+    def test_rebuild(self) -> None:
+        for name in ('movies', 'persons', 'genres'):
+            with self.subTest(name=name):
+                self.assertEqual(set(self.reconcile(name).values()), {0})
+
+    def test_partial_update(self) -> None:
+        filmwork = self.filmworks[0]
+        Filmwork.objects.filter(id=filmwork.id).update(rating=9.5)
+        apply_changes([Change(SyncEntity.FILMWORK, filmwork.id, SyncOperation.UPDATE)])
+        self.assertEqual(set(self.reconcile('movies').values()), {0})
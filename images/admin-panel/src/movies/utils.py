@@ -0,0 +1,33 @@
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import TypeVar
+
+from django.db.models import Model
+from django.db.models.query import QuerySet
+
+T = TypeVar('T')
+M = TypeVar('M', bound=Model)
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Разбивает последовательность на списки длиной не более `size`."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iterate_keyset(queryset: QuerySet[M], batch_size: int) -> Iterator[list[M]]:
+    """
+    Обходит queryset страницами по первичному ключу (keyset pagination).
+    Каждая страница читается серверным курсором, поэтому память ограничена `batch_size`.
+    """
+    last_pk = None
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        batch = list(page[:batch_size].iterator(chunk_size=batch_size))
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
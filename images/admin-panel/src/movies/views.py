@@ -0,0 +1,30 @@
+from ipaddress import ip_address
+
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from config import settings
+from movies import metrics
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Метрики в текстовом формате Prometheus для сборщика из внутренней сети и персонала."""
+    if not _metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _metrics_allowed(request: HttpRequest) -> bool:
+    if request.user.is_authenticated and getattr(request.user, 'is_staff', False):
+        return True
+    # Запрос через обратный прокси пришёл извне, адрес прокси не показателен
+    if 'HTTP_X_FORWARDED_FOR' in request.META or 'HTTP_X_REAL_IP' in request.META:
+        return False
+    try:
+        address = ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in settings.METRICS_ALLOWED_NETWORKS)
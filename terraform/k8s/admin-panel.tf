@@ -34,8 +34,8 @@ resource "kubernetes_deployment" "admin-panel" {
             uv run manage.py createsuperuser --noinput || true 
             uv run manage.py startup_elastic 
             uv run manage.py startup_mongo 
-            uv run manage.py loaddata ../infra/data/dump.json 
-            uv run gunicorn --reload -c ../infra/gunicorn/gunicorn_config.py config.wsgi:application 
+            uv run manage.py load_catalog ../infra/data/dump.json 
+            uv run gunicorn -c ../infra/gunicorn/gunicorn_config.py 
             EOT
           ]
 
@@ -87,6 +87,15 @@ resource "kubernetes_deployment" "admin-panel" {
             name  = "DEBUG"
             value = "False"
           }
+          # У пода нет лимита CPU, поэтому число воркеров задаётся явно, а не по ядрам узла
+          env {
+            name  = "GUNICORN_WORKERS"
+            value = "3"
+          }
+          env {
+            name  = "PROMETHEUS_MULTIPROC_DIR"
+            value = "/tmp/prometheus"
+          }
 
           env {
             name  = "SECRET_KEY"